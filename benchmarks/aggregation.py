@@ -0,0 +1,103 @@
+"""
+Benchmark merging inline text and combining spans of the same style,
+against the previous implementations which joined the text of each group with a Python lambda.
+
+Usage: python benchmarks/aggregation.py [n_spans]
+"""
+import sys
+import time
+import pandas as pd
+from pdf_structure_extractor.lines import Lines
+from frames import synthetic_spans
+
+
+def merge_inline_text_lambda(lines):
+    """
+    Previous Lines.merge_inline_text aggregation, with no exclude_texts.
+    """
+    lines = lines.copy()
+    lines['ignore'] = False
+    lines['h_gap'] = lines['bbox_x1'] - lines['bbox_x2'].shift(1).fillna(0)
+    lines['h_group'] = True
+    lines.loc[
+        (lines['page_number'] == lines['page_number'].shift(1).fillna(0)) &
+        (lines['block_number'] == lines['block_number'].shift(1).fillna(0)) &
+        (lines['line_number'] == lines['line_number'].shift(1).fillna(0)) &
+        ((lines['total_y'] - lines['total_y'].shift(1).fillna(0)).abs() < 2) &
+        (lines['double_fontsize_int'] == lines['double_fontsize_int'].shift(1).fillna(0)) &
+        (lines['span_number'] != 0) &
+        (lines['h_gap'] < 10) & (lines['h_gap'] > 0) &
+        ~lines['ignore'],
+        'h_group'
+    ] = False
+    lines['h_group'] = lines['h_group'].cumsum()
+    lines['text'] = lines['text'].fillna('')
+    agg_funcs = {
+        'index': 'min',
+        'text': lambda x: ' '.join(x.astype(str)),
+        'span_number': 'min',
+        'origin_x': 'min',
+        'bbox_x1': 'min',
+        'bbox_y1': 'min',
+        'bbox_x2': 'max',
+        'bbox_y2': 'max'
+    }
+    agg_funcs = {
+        **agg_funcs,
+        **{col: 'first' for col in lines if col not in agg_funcs}
+    }
+    lines = lines\
+        .reset_index()\
+        .groupby('h_group')\
+        .agg(agg_funcs)\
+        .drop(columns=['h_gap', 'h_group'])\
+        .set_index('index')
+    if 'style' in lines.columns:
+        lines['style'] = lines.calculate_style()
+
+    return lines
+
+
+def combine_spans_same_style_lambda(lines):
+    """
+    Previous Lines.combine_spans_same_style.
+    """
+    lines = lines.copy()
+    lines['text'] = lines\
+        .groupby(['page_number', 'block_number', 'line_number', 'style'])['text']\
+        .transform(lambda x: ' '.join([txt for txt in x if txt == txt]))
+    lines = lines.drop_duplicates(subset=['page_number', 'block_number', 'line_number', 'style', 'text'])
+
+    return lines
+
+
+def timeit(name, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start)/repeat
+    print('{:<50} {:>10.4f}s'.format(name, elapsed))
+
+    return result, elapsed
+
+
+if __name__ == '__main__':
+    n_spans = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    spans = synthetic_spans(n_spans)
+
+    # Close the horizontal gap between spans so that spans of the same size are merged
+    spans['bbox_x2'] = spans['origin_x'] + 115.0
+    lines = Lines(spans)
+    print('{} spans'.format(len(lines)))
+
+    merged_lambda, lambda_time = timeit('merge_inline_text (lambda join)', lambda: merge_inline_text_lambda(lines))
+    merged, vectorised_time = timeit('merge_inline_text (single join)', lambda: lines.merge_inline_text())
+    pd.testing.assert_frame_equal(pd.DataFrame(merged_lambda), pd.DataFrame(merged))
+    print('{:<50} {:>10.1f}x, {} rows'.format('speedup, identical output', lambda_time/vectorised_time, len(merged)))
+
+    combined_lambda, lambda_time = timeit(
+        'combine_spans_same_style (lambda transform)', lambda: combine_spans_same_style_lambda(lines)
+    )
+    combined, vectorised_time = timeit('combine_spans_same_style (single join)', lambda: lines.combine_spans_same_style())
+    pd.testing.assert_frame_equal(pd.DataFrame(combined_lambda), pd.DataFrame(combined))
+    print('{:<50} {:>10.1f}x, {} rows'.format('speedup, identical output', lambda_time/vectorised_time, len(combined)))
@@ -0,0 +1,35 @@
+"""
+Benchmark creating Lines and carrying the derived columns (double_fontsize_int, style, font_importance)
+through slices, copies, and sorts.
+
+Usage: python benchmarks/derived_columns.py [n_spans]
+"""
+import sys
+import time
+from pdf_structure_extractor.lines import Lines
+from frames import synthetic_spans
+
+
+def timeit(name, func, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start)/repeat
+    print('{:<40} {:>10.4f}s'.format(name, elapsed))
+
+
+if __name__ == '__main__':
+    n_spans = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    spans = synthetic_spans(n_spans)
+    print('{} spans'.format(len(spans)))
+
+    timeit('Lines(raw spans) with derivation', lambda: Lines(spans), repeat=1)
+    lines = Lines(spans)
+    timeit('Lines(lines) carrying derived columns', lambda: Lines(lines))
+    timeit('.copy()', lambda: lines.copy())
+    timeit('.loc[boolean mask]', lambda: lines.loc[lines['span_number'] == 0])
+    timeit('.sort_values()', lambda: lines.sort_values(by=['total_y']))
+    timeit('.drop(labels)', lambda: lines.drop(labels=lines.index[:100]))
+    timeit('1000 block slices', lambda: [
+        lines.loc[lines.index[i*10:i*10+10]] for i in range(1000)
+    ], repeat=1)
@@ -0,0 +1,48 @@
+"""
+Synthetic span frames for benchmarking the Lines processing without parsing PDFs.
+"""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_spans(n_spans=100000, spans_per_line=3, lines_per_block=6, blocks_per_page=8, seed=0):
+    """
+    Generate a frame of spans with the columns extracted by Document.raw_lines.
+    """
+    rng = np.random.default_rng(seed)
+    position = np.arange(n_spans)
+    span_number = position % spans_per_line
+    line_number = (position // spans_per_line) % lines_per_block
+    block_number = (position // (spans_per_line*lines_per_block)) % blocks_per_page
+    page_number = position // (spans_per_line*lines_per_block*blocks_per_page)
+
+    # Mostly body text, with some bold and larger headings
+    size = rng.choice([10.0, 10.0, 10.0, 10.0, 12.0, 16.0], size=n_spans)
+    bold = rng.random(n_spans) < 0.15
+    font = np.where(bold, 'Arial-BoldMT', 'ArialMT')
+    words = np.array(['Operations', 'lessons', 'learned', 'THE', 'health', 'shelter', '•', 'a)', 'page', '12'])
+    text = pd.Series(words[rng.integers(0, len(words), size=n_spans)]) + ' ' +\
+        pd.Series(words[rng.integers(0, len(words), size=n_spans)])
+    origin_x = 50.0 + span_number*120.0
+    origin_y = 60.0 + (block_number*lines_per_block + line_number)*14.0
+
+    return pd.DataFrame({
+        'size': size,
+        'font': font,
+        'color': '#000000',
+        'text': text,
+        'bold': bold,
+        'highlight_color': np.where(rng.random(n_spans) < 0.05, '#cce5ff', None),
+        'page_number': page_number,
+        'block_number': block_number,
+        'line_number': line_number,
+        'span_number': span_number,
+        'origin_x': origin_x,
+        'origin_y': origin_y,
+        'total_y': origin_y + page_number*842.0,
+        'img': False,
+        'bbox_x1': origin_x,
+        'bbox_y1': origin_y - size,
+        'bbox_x2': origin_x + 110.0,
+        'bbox_y2': origin_y + 2.0,
+    })
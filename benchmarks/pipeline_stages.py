@@ -0,0 +1,159 @@
+"""
+Benchmark each stage of the document processing on synthetic PDFs, for increasing numbers of pages
+and of spans per page. The timings are saved as JSON so they can be compared across commits.
+
+Usage:
+    python benchmarks/pipeline_stages.py [--pages 5 10 20 40] [--lines 20 40 60] [--output results.json]
+    python benchmarks/pipeline_stages.py --compare old.json new.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import pandas as pd
+from pdf_structure_extractor.document import Document
+from synthetic_pdf import generate_pdf
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def time_stages(content):
+    """
+    Time each stage of Document.lines and Document.to_sections on the content of a PDF, in order.
+    Return the number of raw spans, and the wall time of each stage in seconds, for the stages which were run.
+    """
+    document = Document(content)
+    timings = {}
+
+    def run(name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[name] = time.perf_counter() - start
+        return result
+
+    # The cleaning stages are run through the document pipeline, so skipped stages are not timed
+    raw_lines = run('raw_lines', lambda: document.raw_lines)
+    lines = document.pipeline.run(raw_lines.copy(), run_stage=run, known_repeating=None, repeating=None)
+    lines = run('get_structure', document.get_structure, lines)
+    headings = run('headings', lambda: lines.headings)
+    run('to_items', lines.to_range_items, headings['section_start'], headings['section_end'])
+
+    return len(raw_lines), timings
+
+
+def benchmark(sizes, repeat=3, **options):
+    """
+    Time the stages for each (pages, lines_per_page) size, keeping the fastest of repeat runs of each stage.
+    """
+    results = []
+    for pages, lines_per_page in sizes:
+        content = generate_pdf(pages=pages, lines_per_page=lines_per_page, **options)
+        best = {}
+        for _ in range(repeat):
+            n_spans, timings = time_stages(content)
+            for name, elapsed in timings.items():
+                best[name] = min(best.get(name, elapsed), elapsed)
+        best['total'] = sum(best.values())
+        results.append({'pages': pages, 'lines_per_page': lines_per_page, 'spans': n_spans, 'stages': best})
+        print('{:>5} pages {:>4} lines/page {:>7} spans {:>10.4f}s'.format(
+            pages, lines_per_page, n_spans, best['total']
+        ))
+
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_stages(results):
+    stages = list(dict.fromkeys(name for result in results for name in result['stages']))
+    print('{:<38}'.format('stage') + ''.join('{:>12}'.format(result['spans']) for result in results))
+    for name in stages:
+        print('{:<38}'.format(name) + ''.join(
+            '{:>12.4f}'.format(result['stages'].get(name, float('nan'))) for result in results
+        ))
+
+
+def compare(old_path, new_path):
+    """
+    Print the ratio of the new to the old time of each stage, for the sizes in both results.
+    """
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    print('{} -> {}'.format(old.get('commit'), new.get('commit')))
+
+    for curve in ['pages_curve', 'spans_curve']:
+        old_results = {(result['pages'], result['lines_per_page']): result for result in old[curve]}
+        for result in new[curve]:
+            old_result = old_results.get((result['pages'], result['lines_per_page']))
+            if old_result is None:
+                continue
+            print('\n{} pages, {} lines/page'.format(result['pages'], result['lines_per_page']))
+            for name, elapsed in result['stages'].items():
+                if name in old_result['stages']:
+                    print('{:<38} {:>10.4f}s {:>10.4f}s {:>8.2f}x'.format(
+                        name, old_result['stages'][name], elapsed, old_result['stages'][name]/max(elapsed, 1e-9)
+                    ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[5, 10, 20, 40],
+                        help='Numbers of pages of the pages scaling curve')
+    parser.add_argument('--lines', type=int, nargs='+', default=[20, 40, 55],
+                        help='Numbers of lines per page of the spans scaling curve')
+    parser.add_argument('--fixed-pages', type=int, default=10, help='Number of pages of the spans scaling curve')
+    parser.add_argument('--fixed-lines', type=int, default=40, help='Lines per page of the pages scaling curve')
+    parser.add_argument('--bullet-density', type=float, default=0.2)
+    parser.add_argument('--highlights', type=int, default=10, help='Highlight drawings per page')
+    parser.add_argument('--image-every', type=int, default=4)
+    parser.add_argument('--no-headers-footers', action='store_true')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Path of the JSON results, by default results/pipeline_stages_<commit>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two JSON results and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit()
+
+    options = {
+        'bullet_density': args.bullet_density,
+        'headers_footers': not args.no_headers_footers,
+        'highlights_per_page': args.highlights,
+        'image_every': args.image_every,
+    }
+    print('Pages scaling curve')
+    pages_curve = benchmark([(pages, args.fixed_lines) for pages in args.pages], repeat=args.repeat, **options)
+    print_stages(pages_curve)
+    print('\nSpans scaling curve')
+    spans_curve = benchmark([(args.fixed_pages, lines) for lines in args.lines], repeat=args.repeat, **options)
+    print_stages(spans_curve)
+
+    commit = get_commit()
+    output = args.output or os.path.join(RESULTS_DIRECTORY, 'pipeline_stages_{}.json'.format(commit or 'unknown'))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump({
+            'commit': commit,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'options': options,
+            'repeat': args.repeat,
+            'pages_curve': pages_curve,
+            'spans_curve': spans_curve,
+        }, file, indent=2)
+    print('\nSaved {}'.format(output))
@@ -0,0 +1,116 @@
+"""
+Synthetic appeal-like PDFs for benchmarking, generated with PyMuPDF.
+
+Usage: python benchmarks/synthetic_pdf.py output.pdf [pages]
+"""
+import sys
+import random
+import fitz
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+LINE_HEIGHT = 13
+
+
+def generate_pdf(
+    pages=10, lines_per_page=40, bullet_density=0.2, headers_footers=True,
+    highlights_per_page=10, image_every=4, seed=0
+):
+    """
+    Generate a PDF with headings, body text, bullet points, and optionally repeating headers and footers,
+    coloured highlight drawings, and images with photo captions.
+
+    Parameters
+    ----------
+    pages : int (default=10)
+        Number of pages.
+
+    lines_per_page : int (default=40)
+        Number of lines of text on each page, including headings and bullet points.
+
+    bullet_density : float (default=0.2)
+        Fraction of the lines which are bullet points, written as a bullet character span followed by a text span.
+
+    headers_footers : bool (default=True)
+        Whether to add a repeating header and a footer with the page number on every page.
+
+    highlights_per_page : int (default=10)
+        Number of coloured rectangles drawn behind the text of each page.
+
+    image_every : int (default=4)
+        Add an image with a photo caption every image_every pages. If 0 or None, no images are added.
+
+    seed : int (default=0)
+        Seed of the random choices of line types and colours.
+
+    Returns
+    -------
+    content : bytes
+        Content of the PDF.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    top, bottom = 70, PAGE_HEIGHT - 60
+    lines_per_page = min(lines_per_page, (bottom - top) // LINE_HEIGHT)
+
+    for page_number in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+
+        # Coloured drawings behind the text, which are used as highlight colours
+        for _ in range(highlights_per_page):
+            x, y = rng.uniform(40, PAGE_WIDTH - 140), rng.uniform(top, bottom - 20)
+            page.draw_rect(
+                fitz.Rect(x, y, x + rng.uniform(40, 120), y + rng.uniform(10, 20)),
+                color=None, fill=(rng.random(), 0.8, 0.9), overlay=False
+            )
+
+        if headers_footers:
+            page.insert_text((50, 30), 'Emergency Appeal Final Report', fontsize=8)
+            page.insert_text((PAGE_WIDTH - 110, 30), 'MDRXX001', fontsize=8)
+            page.insert_text((PAGE_WIDTH/2 - 15, PAGE_HEIGHT - 20), 'Page {}'.format(page_number + 1), fontsize=8)
+
+        y = top
+        for line_number in range(lines_per_page):
+            choice = rng.random()
+            if line_number == 0 and page_number % 3 == 0:
+                page.insert_text((50, y), 'Section {} Overview'.format(page_number), fontsize=16, fontname='hebo')
+                y += 2*LINE_HEIGHT
+            elif choice < 0.05:
+                page.insert_text((50, y), 'Subheading {} {}'.format(page_number, line_number), fontsize=12,
+                                 fontname='hebo')
+                y += LINE_HEIGHT + 4
+            elif choice < 0.05 + bullet_density:
+                page.insert_text((50, y), '•', fontsize=10)
+                page.insert_text((62, y), 'Bullet item {} about operations on page {}.'.format(
+                    line_number, page_number
+                ), fontsize=10)
+                y += LINE_HEIGHT
+            elif choice < 0.1 + bullet_density:
+                page.insert_text((50, y), 'Inline ', fontsize=10)
+                page.insert_text((80, y), 'BOLD', fontsize=10, fontname='hebo')
+                page.insert_text((108, y), ' text in a sentence.', fontsize=10)
+                y += LINE_HEIGHT
+            else:
+                ending = '.' if rng.random() < 0.3 else ','
+                page.insert_text((50, y), 'This is body text line {} on page {} with some words{}'.format(
+                    line_number, page_number, ending
+                ), fontsize=10)
+                y += LINE_HEIGHT
+
+        # Images with a caption, which are removed as photo blocks
+        if image_every and (page_number % image_every == image_every - 1):
+            pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 20, 20), False)
+            pixmap.clear_with(200)
+            page.insert_image(fitz.Rect(300, 600, 540, 740), pixmap=pixmap)
+            page.insert_text((310, 700), 'Photo: volunteers distributing relief items', fontsize=9)
+
+    content = doc.tobytes()
+    doc.close()
+
+    return content
+
+
+if __name__ == '__main__':
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with open(sys.argv[1], 'wb') as file:
+        file.write(generate_pdf(pages=pages))
@@ -1 +1,3 @@
-from pdf_structure_extractor.document import Document
\ No newline at end of file
+__version__ = '1.0.0'
+
+from pdf_structure_extractor.document import Document  # noqa: E402
@@ -0,0 +1,238 @@
+"""
+Process many documents, writing the sections of each document to disk as they are finished.
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pdf_structure_extractor.document import Document
+from pdf_structure_extractor.sources import is_url, download, get_session
+from pdf_structure_extractor.tracing import StageStatsCollector
+from pdf_structure_extractor.section_index import SectionIndex
+
+# File in the output directory recording the result of each document, one JSON object per line
+RESULTS_FILENAME = 'results.jsonl'
+
+# File in the output directory with the statistics of each processing stage across documents
+STAGE_STATS_FILENAME = 'stage_stats.csv'
+
+
+def read_manifest(path):
+    """
+    Read document URLs or paths from a manifest file, one per line. Blank lines and lines starting with # are ignored.
+    """
+    with open(path) as manifest:
+        for line in manifest:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def get_output_path(source, output_dir):
+    """
+    Get the path of the output file of a document, named after the source.
+    """
+    name = os.path.splitext(os.path.basename(source.rstrip('/')))[0] or 'document'
+    name = ''.join(char if (char.isalnum() or char in '-_') else '_' for char in name)[:100]
+    source_hash = hashlib.sha1(source.encode()).hexdigest()[:10]
+
+    return os.path.join(output_dir, '{}-{}.json'.format(name, source_hash))
+
+
+def fetch_document(source, session=None):
+    """
+    Download a document to a temporary file if it is a URL.
+    Return the path to process, and whether the path is a temporary file.
+    """
+    if is_url(source):
+        return download(source, session=session), True
+    return source, False
+
+
+def process_document(path, source, output_dir, cache=None, trace=False):
+    """
+    Get the sections of a document and write them to a JSON file in the output directory.
+    Run in the worker processes. If trace is set, the records of the processing stages are returned in 'stages'.
+    """
+    collector = StageStatsCollector() if trace else None
+    with Document(path, cache=cache, tracer=collector) as document:
+        sections = document.to_sections()
+        content_hash = document.content_hash
+
+    # Write to a temporary file first so that partial outputs are never left
+    output_path = get_output_path(source, output_dir)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    with os.fdopen(file_descriptor, 'w') as output:
+        json.dump({'source': source, 'sections': sections}, output)
+    os.replace(temporary_path, output_path)
+
+    result = {
+        'source': source,
+        'status': 'processed',
+        'output': output_path,
+        'sections': len(sections),
+        'content_hash': content_hash
+    }
+    if collector is not None:
+        for record in collector.records:
+            record['document'] = source
+        result['stages'] = collector.records
+
+    return result
+
+
+def process_documents(
+    sources, output_dir, workers=None, download_workers=4, max_in_flight=None, cache=None, collector=None,
+    index=None
+):
+    """
+    Process documents, downloading with threads and extracting in a pool of processes.
+    Results are written to the output directory as each document finishes, and the status of each document,
+    including any error, is appended to results.jsonl. Failed documents do not stop the run.
+
+    Parameters
+    ----------
+    sources : iterable of strings (required)
+        URLs or paths of the documents. Can be a generator, e.g. from read_manifest.
+
+    output_dir : string (required)
+        Directory to write the sections of each document and the results file to.
+
+    workers : int (default=None)
+        Number of processes extracting documents. If None, the number of CPUs.
+
+    download_workers : int (default=4)
+        Number of threads downloading documents.
+
+    max_in_flight : int (default=None)
+        Maximum number of documents being downloaded or processed at once, which bounds the disk and memory used.
+        If None, twice the number of workers.
+
+    cache : string (default=None)
+        Directory of a LinesCache shared between the workers.
+
+    collector : StageStatsCollector (default=None)
+        If set, the processing stages of each document are traced in the workers, and the records are added to it.
+        Stages are not profiled in the workers.
+
+    index : SectionIndex (default=None)
+        If set, the sections of each processed document are added to it, replacing the sections of the same PDF.
+
+    Returns
+    -------
+    summary : dict
+        Number of documents processed and failed.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2*workers
+    os.makedirs(output_dir, exist_ok=True)
+    session = get_session(pool_maxsize=download_workers)
+
+    sources = iter(sources)
+    summary = {'processed': 0, 'failed': 0}
+    pending = {}
+    with ThreadPoolExecutor(max_workers=download_workers) as downloads, \
+            ProcessPoolExecutor(max_workers=workers) as extractions, \
+            open(os.path.join(output_dir, RESULTS_FILENAME), 'a') as results:
+        sources_finished = False
+        while True:
+
+            # Start downloading more documents while there is space in the queue
+            while (not sources_finished) and (len(pending) < max_in_flight):
+                source = next(sources, None)
+                if source is None:
+                    sources_finished = True
+                    break
+                pending[downloads.submit(fetch_document, source, session)] = ('download', source, None)
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, source, fetched = pending.pop(future)
+                try:
+                    result = future.result()
+
+                    # Send downloaded documents to the extraction workers
+                    if stage == 'download':
+                        path, _ = result
+                        pending[extractions.submit(
+                            process_document, path, source, output_dir, cache, collector is not None
+                        )] = ('extract', source, result)
+                        continue
+
+                    # Keep the stage records of processed documents in the collector, not in the results file
+                    if collector is not None:
+                        collector.add_records(result.pop('stages', []))
+                    if index is not None:
+                        with open(result['output']) as output:
+                            index.add_document(result['content_hash'], json.load(output)['sections'], source=source)
+                except Exception as error:
+                    result = {
+                        'source': source,
+                        'status': 'failed',
+                        'stage': stage,
+                        'error': '{}: {}'.format(type(error).__name__, error)
+                    }
+
+                # Remove downloaded files once processed
+                if fetched is not None:
+                    path, temporary = fetched
+                    if temporary and os.path.exists(path):
+                        os.remove(path)
+
+                summary[result['status']] += 1
+                results.write(json.dumps(result)+'\n')
+                results.flush()
+
+    return summary
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Extract the sections of PDF documents, writing one JSON file per document.'
+    )
+    parser.add_argument('sources', nargs='*', help='URLs or paths of documents')
+    parser.add_argument('-m', '--manifest', help='File listing URLs or paths of documents, one per line')
+    parser.add_argument('-o', '--output-dir', required=True, help='Directory to write the outputs to')
+    parser.add_argument('-w', '--workers', type=int, help='Number of extraction processes (default: CPUs)')
+    parser.add_argument('-d', '--download-workers', type=int, default=4, help='Number of download threads')
+    parser.add_argument('--max-in-flight', type=int, help='Maximum documents downloaded or processing at once')
+    parser.add_argument('--cache', help='Directory to cache extracted lines in')
+    parser.add_argument('--stage-stats', action='store_true',
+                        help='Time the processing stages and write their statistics to {}'.format(STAGE_STATS_FILENAME))
+    parser.add_argument('--index', help='SQLite section index to add the sections of the documents to')
+    args = parser.parse_args(args)
+
+    sources = list(args.sources)
+    if args.manifest:
+        sources = [*sources, *read_manifest(args.manifest)]
+    if not sources:
+        parser.error('no documents given, pass URLs or paths or a --manifest')
+
+    collector = StageStatsCollector() if args.stage_stats else None
+    index = SectionIndex(args.index) if args.index else None
+    summary = process_documents(
+        sources=sources,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        download_workers=args.download_workers,
+        max_in_flight=args.max_in_flight,
+        cache=args.cache,
+        collector=collector,
+        index=index
+    )
+    if index is not None:
+        index.close()
+    if collector is not None:
+        collector.summary().to_csv(os.path.join(args.output_dir, STAGE_STATS_FILENAME))
+    print('Processed {processed} documents, {failed} failed'.format(**summary))
+
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+On-disk cache of extracted and processed lines, keyed by the content of the PDF,
+and of extracted pages, keyed by the content of the page.
+"""
+import os
+import contextlib
+import json
+import pickle
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+from pdf_structure_extractor import __version__
+from pdf_structure_extractor.lines import Lines
+
+# Columns of sequences, which are read back from Parquet as arrays
+TUPLE_COLUMNS = ['origin', 'bbox']
+LIST_COLUMNS = ['children']
+
+# End of the file names of cached pages
+PAGE_SUFFIX = '-page.pickle'
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def hash_source(source, chunk_size=1024*1024):
+    """
+    Get the SHA-256 hash of the content of an opened PDFSource.
+    """
+    sha256 = hashlib.sha256()
+    if source.path is not None:
+        with open(source.path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                sha256.update(chunk)
+    else:
+        sha256.update(source.stream)
+
+    return sha256.hexdigest()
+
+
+def hash_options(options):
+    """
+    Get a short hash of the processing options which change the cached lines.
+    """
+    return hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class LinesCache:
+    def __init__(self, directory, max_size=1024**3, file_format=None):
+        """
+        Cache of raw lines and processed lines on disk.
+        Entries are keyed by the content hash of the PDF, the library version, and the processing options.
+        The least recently used entries are deleted when the cache grows over the maximum size.
+
+        Parameters
+        ----------
+        directory : string (required)
+            Directory to store the cached lines in. Created if it does not exist.
+
+        max_size : int (default=1GB)
+            Maximum total size of the cached files in bytes.
+
+        file_format : string (default=None)
+            'parquet' or 'pickle'. If None, Parquet is used if pyarrow is installed, otherwise pickle.
+        """
+        if file_format is None:
+            file_format = 'parquet' if parquet_available() else 'pickle'
+        if file_format not in ['parquet', 'pickle']:
+            raise ValueError('Unrecognised file format "{}", should be "parquet" or "pickle"'.format(file_format))
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        self.file_format = file_format
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_path(self, content_hash, kind, options=None):
+        """
+        Get the path of a cache entry.
+        """
+        name = '{}-{}-{}'.format(content_hash, __version__, kind)
+        if options:
+            name += '-'+hash_options(options)
+
+        return os.path.join(self.directory, name+'.'+self.file_format)
+
+    def get(self, content_hash, kind, options=None):
+        """
+        Get cached lines, or None if they are not in the cache.
+
+        Parameters
+        ----------
+        content_hash : string (required)
+            Hash of the content of the PDF.
+
+        kind : string (required)
+            Kind of lines, e.g. 'raw_lines' or 'lines'.
+
+        options : dict (default=None)
+            Processing options used to produce the lines.
+        """
+        path = self.get_path(content_hash, kind, options)
+        try:
+            if self.file_format == 'parquet':
+                lines = pd.read_parquet(path)
+            else:
+                lines = pd.read_pickle(path)
+        except FileNotFoundError:
+            return None
+
+        # Mark as recently used, unless another process evicted the file after it was read
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+
+        if self.file_format == 'parquet':
+            lines = self.restore_sequences(lines)
+
+        return Lines(lines)
+
+    def put(self, content_hash, kind, lines, options=None):
+        """
+        Add lines to the cache, then delete the least recently used entries if the cache is too big.
+        """
+        path = self.get_path(content_hash, kind, options)
+
+        # Write to a temporary file first so that readers never see a partial file
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(file_descriptor)
+        try:
+            if self.file_format == 'parquet':
+                pd.DataFrame(lines).to_parquet(temporary_path)
+            else:
+                pd.to_pickle(pd.DataFrame(lines), temporary_path)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        self.evict()
+
+    def restore_sequences(self, lines):
+        """
+        Convert sequence columns read from Parquet as arrays back to tuples and lists.
+        """
+        for columns, sequence_type in [(TUPLE_COLUMNS, tuple), (LIST_COLUMNS, list)]:
+            for column in columns:
+                if column in lines.columns:
+                    lines[column] = [
+                        sequence_type(value.tolist()) if isinstance(value, np.ndarray) else value
+                        for value in lines[column]
+                    ]
+
+        return lines
+
+    def is_entry(self, name):
+        """
+        Check whether a file in the directory is an entry of this cache, rather than e.g. a page of a PageCache.
+        """
+        return name.endswith('.'+self.file_format) and not name.endswith(PAGE_SUFFIX)
+
+    def get_entries(self):
+        """
+        Get the cached files as a list of (last used time, size, path), least recently used first.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and self.is_entry(entry.name):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        return sorted(entries)
+
+    @property
+    def size(self):
+        """
+        Get the total size of the cached files in bytes.
+        """
+        return sum(size for _, size, _ in self.get_entries())
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache is within the maximum size.
+        """
+        entries = self.get_entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        """
+        Delete all cached entries.
+        """
+        for _, _, path in self.get_entries():
+            os.remove(path)
+
+
+class PageCache(LinesCache):
+    def __init__(self, directory, max_size=1024**3):
+        """
+        Cache of the extracted spans of pages on disk, keyed by the page fingerprint from get_page_fingerprint.
+        Unchanged pages of a re-published document are read from the cache instead of being extracted again.
+        Pages are stored with pickle, and the least recently used pages are deleted as in LinesCache.
+
+        Parameters
+        ----------
+        directory : string (required)
+            Directory to store the cached pages in. Created if it does not exist. Can be shared with a LinesCache.
+
+        max_size : int (default=1GB)
+            Maximum total size of the cached files in bytes.
+        """
+        super().__init__(directory, max_size=max_size, file_format='pickle')
+
+    def is_entry(self, name):
+        return name.endswith(PAGE_SUFFIX)
+
+    def get_page_path(self, fingerprint, columnar=False):
+        name = '{}-{}-{}'.format(fingerprint, __version__, 'columns' if columnar else 'spans')
+        return os.path.join(self.directory, name+PAGE_SUFFIX)
+
+    def get_page(self, fingerprint, columnar=False):
+        """
+        Get the spans and height of a cached page, as returned by extract_page_spans or extract_page_columns,
+        or None if the page is not in the cache.
+        """
+        path = self.get_page_path(fingerprint, columnar=columnar)
+        try:
+            with open(path, 'rb') as file:
+                page = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+
+        return page
+
+    def put_page(self, fingerprint, page, columnar=False):
+        """
+        Add the spans and height of an extracted page to the cache.
+        """
+        path = self.get_page_path(fingerprint, columnar=columnar)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                pickle.dump(page, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        self.evict()
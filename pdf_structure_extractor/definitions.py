@@ -5,4 +5,15 @@ BULLETS = [
     u'\u25CB', u'\u25CF', u'\u25D8', u'\u25E6', u'\u2619', u'\u2765',
     u'\2767', u'\u29BE', u'\u29BF', u'\u25C9', u'\uf0a7', u'\uf0d8',
     u'\uf076'
-]
\ No newline at end of file
+]
+
+# Words ignored when comparing texts
+FILLER_WORDS = ['and', 'the', 'to', 'for', 'in', 'a', 'in', 'or', 'key']
+
+# Weights of the text features in the font importance score, used to find headings
+# Fontsize is the most important, then boldness, then uppercase
+FONT_IMPORTANCE_WEIGHTS = {
+    'size': 100,
+    'bold': 10,
+    'uppercase': 1
+}
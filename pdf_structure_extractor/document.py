@@ -1,110 +1,415 @@
-import requests
+import os
+import warnings
 from functools import cached_property
-import fitz
 from pdf_structure_extractor.lines import Lines
-from pdf_structure_extractor import utils, definitions
+from pdf_structure_extractor.sources import PDFSource, DEFAULT_TIMEOUT
+from pdf_structure_extractor.cache import LinesCache, PageCache, hash_source
+from pdf_structure_extractor.extraction import (
+    extract_page_spans, extract_page_columns, extract_pages_parallel,
+    get_page_fingerprint, set_page_number, get_page_offsets, stitch_pages, stitch_page_columns
+)
+from pdf_structure_extractor.headers_footers import HeaderFooterEngine, HeaderFooterTemplates
+from pdf_structure_extractor.streaming import SectionStream
+from pdf_structure_extractor.pipeline import Pipeline
+from pdf_structure_extractor.sections import Sections
+from pdf_structure_extractor.heading_index import HeadingIndex
+from pdf_structure_extractor import definitions
+import numpy as np
 import pandas as pd
 
 
 class Document:
-    def __init__(self, document_url, raw_lines=None, lines=None):
+    def __init__(
+        self, document_url, raw_lines=None, lines=None, workers=None, font_importance_weights=None,
+        session=None, timeout=DEFAULT_TIMEOUT, cache=None, columnar=False,
+        compact=False, pages=None, tracer=None, pipeline=None, children=False, templates=None, page_cache=None
+    ):
         """
         Class representing an Emergency Appeal document, e.g. a final report.
 
         Parameters
         ----------
-        document_url : string (required)
-            Download URL for the document.
+        document_url : string, path, file-like object, or bytes (required)
+            Download URL for the document. Can also be a path to a local file, a binary file-like object,
+            or the content of the PDF as bytes or a memoryview.
+            Local files are opened from the path or memory-mapped, and URLs are streamed to a temporary file.
 
         raw_lines : pandas DataFrame (default=None)
             Lines extracted from the document. Used for testing and debugging to speed up the processing.
+
+        workers : int (default=None)
+            Number of processes to extract pages in parallel. If None or 1, pages are extracted in the current process.
+
+        font_importance_weights : dict (default=None)
+            Weights of 'size', 'bold', and 'uppercase' in the font importance used to find headings.
+            If None, the default weights in definitions.FONT_IMPORTANCE_WEIGHTS are used.
+
+        session : requests.Session (default=None)
+            Session used to download the document. If None, a shared session with connection pooling and retries is used.
+
+        timeout : float or tuple (default=DEFAULT_TIMEOUT)
+            Connect and read timeouts for the download, in seconds.
+
+        cache : LinesCache or string (default=None)
+            Cache of raw lines and processed lines, or a directory to store a cache in.
+            If set, lines are read from the cache when the same PDF has been processed before.
+
+        columnar : bool (default=False)
+            If True, spans are extracted straight into typed columns, keeping only the columns used by the processing.
+            Coordinates are single precision floats, numbers are 32-bit integers, and fonts and colours are categorical.
+            This uses much less memory for large documents.
+
+        compact : bool (default=False)
+            If True, the raw lines and processed lines are converted to a compact schema with Lines.compact:
+            categorical fonts, styles, and colours, and 32-bit numbers.
+            Use to hold the lines of many documents in memory.
+
+        pages : iterable of ints (default=None)
+            Numbers of the pages to extract, starting from 0, e.g. range(5) for the first five pages.
+            If None, all pages are extracted. The total_y of the lines is the same as when all pages are extracted.
+
+        tracer : StageTracer (default=None)
+            Tracer measuring the time, rows, and memory of each stage of the processing,
+            e.g. a StageStatsCollector shared between documents.
+
+        pipeline : Pipeline or string (default=None)
+            Stages cleaning the raw lines, or the name of a preset of the stages of get_pipeline: 'default' or 'fast'.
+            The 'fast' preset skips photo blocks and date superscripts, e.g. for text-only reports,
+            and the second header and footer pass when the first pass dropped no repeating headers or footers.
+            If None, the default stages are used. The pipeline can also be changed before the lines are processed.
+
+        children : bool (default=False)
+            If True, the processed lines also have the index labels of the lines of each heading's section as lists,
+            in the "children" column. The sections are always available from the section_start and section_end columns.
+
+        templates : HeaderFooterTemplates or string (default=None)
+            Templates of repeating headers and footers learned from other documents, or a JSON file to keep them in.
+            Headers and footers matching a template are removed without searching for repeating elements,
+            which also removes them from short documents. Otherwise the repeating elements found are learned.
+
+        page_cache : PageCache or string (default=None)
+            Cache of extracted pages keyed by their content, or a directory to store a cache in.
+            If set, pages which have not changed since another version of the document was extracted
+            are read from the cache, and only the changed pages are extracted.
         """
         self.document_url = document_url
         self.raw_lines_input = raw_lines
         self.lines_input = lines
+        self.workers = workers
+        self.font_importance_weights = font_importance_weights
+        self.session = session
+        self.timeout = timeout
+        self.cache = LinesCache(cache) if isinstance(cache, (str, os.PathLike)) else cache
+        self.columnar = columnar
+        self.compact = compact
+        self.pages = None if pages is None else sorted(set(pages))
+        self.tracer = tracer
+        self.children = children
+        self.templates = HeaderFooterTemplates(templates) if isinstance(templates, (str, os.PathLike)) else templates
+        self.page_cache = PageCache(page_cache) if isinstance(page_cache, (str, os.PathLike)) else page_cache
+
+        # Fingerprints of the pages by page number, and digests of the fonts by xref, used with the page cache
+        self.page_fingerprints = {}
+        self.font_digests = {}
+
+        # Header and footer lines dropped while cleaning, learned by the templates once the document is processed
+        self.found_headers_footers = []
+        self.templates_learned = False
+        self.pipeline = pipeline if isinstance(pipeline, Pipeline) else self.get_pipeline(pipeline or 'default')
+        self.source = None
+        self.doc = None
+        self.page_extractions = {}
 
     @cached_property
     def raw_lines(self):
         """
         Extract lines from the appeal document using PyMuPDF.
+        Only the selected pages are extracted if pages is set.
         """
         if self.raw_lines_input is not None:
-            return Lines(self.raw_lines_input)
+            return self.compact_lines(self.score_font_importance(Lines(self.raw_lines_input)))
 
         if not self.document_url:
             return None
 
-        # Extract lines from the PDF
-        data = []
-        total_y = 0
-
-        # Get the document content and open with fitz
-        document_url = self.document_url
-        document = requests.get(document_url)
-        doc = fitz.open(stream=document.content, filetype='pdf')
-
-        # Loop through pages and paragraphs
-        for page_number, page_layout in enumerate(doc):
-
-            # Get drawings to get text highlights
-            coloured_drawings = [
-                drawing
-                for drawing in page_layout.get_drawings()
-                if (drawing['fill'] != (0.0, 0.0, 0.0))
-            ]
-            page_images = page_layout.get_image_info()
-
-            # Loop through blocks
-            blocks = page_layout.get_text("dict", flags=11)["blocks"]
-            for block_number, block in enumerate(blocks):
-                for line_number, line in enumerate(block["lines"]):
-                    spans = [span for span in line['spans'] if span['text'].strip()]
-                    for span_number, span in enumerate(spans):
-
-                        # Check if the text block is contained in a drawing
-                        highlights = []
-                        for drawing in coloured_drawings:
-                            if utils.get_overlap(span['bbox'], drawing['rect']):
-                                drawing['overlap'] = utils.get_overlap(span['bbox'], drawing['rect'])
-                                highlights.append(drawing)
-
-                        # Get largest overlap
-                        highlight_color_hex = None
-                        if highlights:
-                            largest_highlight = max(highlights, key=lambda x: x['overlap'])
-                            highlight_color = largest_highlight['fill']
-                            if highlight_color:
-                                highlight_color_hex = '#%02x%02x%02x' % (
-                                    int(255*highlight_color[0]),
-                                    int(255*highlight_color[1]),
-                                    int(255*highlight_color[2])
-                                )
-
-                        # Check if the span is contained in any page images
-                        contains_images = [img for img in page_images if utils.contains(img['bbox'], span['bbox'])]
-
-                        # Append results
-                        span['text'] = span['text'].replace('\r', '\n')
-                        span['bold'] = ("black" in span['font'].lower()) or ("bold" in span['font'].lower())
-                        span['color'] = "#%06x" % span['color']
-                        span['highlight_color'] = highlight_color_hex
-                        span['page_number'] = page_number
-                        span['block_number'] = block_number
-                        span['line_number'] = line_number
-                        span['span_number'] = span_number
-                        span['origin_x'] = span['origin'][0]
-                        span['origin_y'] = span['origin'][1]
-                        span['total_y'] = span['origin'][1]+total_y
-                        span['img'] = bool(contains_images)
-                        span['bbox_x1'] = span['bbox'][0]
-                        span['bbox_y1'] = span['bbox'][1]
-                        span['bbox_x2'] = span['bbox'][2]
-                        span['bbox_y2'] = span['bbox'][3]
-                        data.append(span)
-
-            total_y += page_layout.rect.height
-
-        return Lines(pd.DataFrame(data))
+        cached_lines = self.get_cached('raw_lines')
+        if cached_lines is not None:
+            return cached_lines
+
+        # Open the document with fitz, downloading it first if it is a URL
+        try:
+            page_numbers = self.select_pages(self.pages)
+            raw_lines = self.extract_lines(page_numbers)
+        finally:
+            self.close()
+
+        # The raw lines hold the spans of the pages, so the extracted pages are not kept
+        for page_number in page_numbers:
+            self.page_extractions.pop(page_number, None)
+        self.add_to_cache('raw_lines', raw_lines)
+
+        return raw_lines
+
+    def open_document(self):
+        """
+        Open the document with PyMuPDF. The document is kept open until close() is called.
+        """
+        if self.doc is None:
+            self.doc = self.open_source().open()
+
+        return self.doc
+
+    @cached_property
+    def page_heights(self):
+        """
+        Heights of the pages of the document, from the page rectangles without extracting the text.
+        """
+        doc = self.open_document()
+
+        return [doc[page_number].rect.height for page_number in range(doc.page_count)]
+
+    def select_pages(self, pages=None):
+        """
+        Get the sorted numbers of the selected pages, starting from 0. If pages is None, all pages are selected.
+        """
+        page_count = len(self.page_heights)
+        if pages is None:
+            return list(range(page_count))
+
+        page_numbers = sorted(set(pages))
+        out_of_range = [page_number for page_number in page_numbers if not 0 <= page_number < page_count]
+        if out_of_range:
+            raise ValueError('Pages {} are not in the document, which has {} pages'.format(out_of_range, page_count))
+
+        return page_numbers
+
+    def extract_pages(self, page_numbers):
+        """
+        Extract the spans of pages which have not been extracted yet, in a pool of processes if requested.
+        Each page is extracted once and kept in page_extractions.
+        If there is a page cache, unchanged pages are read from it, and the extracted pages are added to it.
+
+        Returns
+        -------
+        pages : list of tuples
+            (spans, page_height) or (columns, page_height) of each page, in the order of page_numbers.
+        """
+        missing_page_numbers = [
+            page_number for page_number in page_numbers if page_number not in self.page_extractions
+        ]
+        if missing_page_numbers and (self.page_cache is not None):
+            missing_page_numbers = self.get_cached_pages(missing_page_numbers)
+        if missing_page_numbers:
+            doc = self.open_document()
+            if self.workers and self.workers > 1 and len(missing_page_numbers) > 1:
+                pages = extract_pages_parallel(
+                    source=self.open_source().shareable,
+                    page_count=doc.page_count,
+                    workers=self.workers,
+                    columnar=self.columnar,
+                    page_numbers=missing_page_numbers
+                )
+            else:
+                extract_page = extract_page_columns if self.columnar else extract_page_spans
+                pages = [
+                    extract_page(doc[page_number], page_number)
+                    for page_number in missing_page_numbers
+                ]
+            self.page_extractions.update(zip(missing_page_numbers, pages))
+            if self.page_cache is not None:
+                for page_number, page in zip(missing_page_numbers, pages):
+                    self.page_cache.put_page(self.get_page_fingerprint(page_number), page, columnar=self.columnar)
+
+        return [self.page_extractions[page_number] for page_number in page_numbers]
+
+    def get_page_fingerprint(self, page_number):
+        """
+        Get the fingerprint of the content of a page, from get_page_fingerprint. Only computed for pages which are used.
+        """
+        if page_number not in self.page_fingerprints:
+            self.page_fingerprints[page_number] = get_page_fingerprint(
+                self.open_document()[page_number], font_digests=self.font_digests
+            )
+
+        return self.page_fingerprints[page_number]
+
+    def get_cached_pages(self, page_numbers):
+        """
+        Read pages from the page cache into page_extractions, with their page numbers in this document.
+        Return the numbers of the pages which are not in the cache.
+        """
+        missing_page_numbers = []
+        for page_number in page_numbers:
+            page = self.page_cache.get_page(self.get_page_fingerprint(page_number), columnar=self.columnar)
+            if page is None:
+                missing_page_numbers.append(page_number)
+            else:
+                self.page_extractions[page_number] = set_page_number(page, page_number, columnar=self.columnar)
+
+        return missing_page_numbers
+
+    def extract_lines(self, page_numbers):
+        """
+        Get the raw lines of pages, with total_y offset by the heights of all previous pages of the document.
+        The total_y of each line is the same whether or not the other pages are extracted.
+        """
+        pages = self.extract_pages(page_numbers)
+        page_offsets = get_page_offsets(self.page_heights)
+        offsets = [page_offsets[page_number] for page_number in page_numbers]
+        if self.columnar:
+            data = stitch_page_columns(pages, offsets=offsets)
+        else:
+            data = stitch_pages(pages, offsets=offsets)
+
+        return self.compact_lines(self.score_font_importance(Lines(data)))
+
+    def get_page(self, page_number):
+        """
+        Get the raw lines of a page, extracting the page if needed.
+        """
+        if ('raw_lines' in self.__dict__) and (self.raw_lines is not None):
+            if page_number in self.select_pages(self.pages):
+                return self.raw_lines.loc[self.raw_lines['page_number'] == page_number]
+
+        return self.extract_lines(self.select_pages([page_number]))
+
+    def iter_pages(self, pages=None):
+        """
+        Iterate over the raw lines of each page, extracting each page only when it is reached.
+        Use the document as a context manager to close it after iterating.
+
+        Parameters
+        ----------
+        pages : iterable of ints (default=None)
+            Numbers of the pages, starting from 0. If None, the selected pages of the document, or all pages.
+
+        Yields
+        ------
+        page_number : int
+
+        lines : Lines
+            Raw lines of the page.
+        """
+        for page_number in self.select_pages(self.pages if pages is None else pages):
+            yield page_number, self.get_page(page_number)
+
+    def open_source(self):
+        """
+        Open the document source, downloading the document if it is a URL.
+        The source is kept open until close() is called, so the document is only downloaded once.
+        """
+        if self.source is None:
+            self.source = PDFSource(self.document_url, session=self.session, timeout=self.timeout).__enter__()
+
+        return self.source
+
+    def close(self):
+        """
+        Close the document and the document source, deleting any downloaded file.
+        """
+        if self.doc is not None:
+            self.doc.close()
+        self.doc = None
+        if self.source is not None:
+            self.source.__exit__(None, None, None)
+        self.source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @cached_property
+    def content_hash(self):
+        """
+        SHA-256 hash of the content of the PDF, used as the cache key.
+        """
+        return hash_source(self.open_source())
+
+    @property
+    def label(self):
+        """
+        Name of the document in traces: the URL or path, or the hash of the content.
+        """
+        if isinstance(self.document_url, (str, os.PathLike)):
+            return str(self.document_url)
+        if self.document_url is not None:
+            return self.content_hash
+
+    def run_stage(self, name, func, *args, **kwargs):
+        """
+        Run a stage of the processing, func(*args, **kwargs), measured by the tracer if there is one.
+        """
+        if self.tracer is None:
+            return func(*args, **kwargs)
+
+        return self.tracer.trace(name, func, *args, document=self.label, **kwargs)
+
+    def get_cache_options(self, kind):
+        """
+        Options which change the extracted ('raw_lines') or processed ('lines') lines, added to the cache key.
+        The templates are keyed by their content, so lines processed with other templates are not reused.
+        """
+        options = {
+            'font_importance_weights': self.font_importance_weights,
+            'columnar': self.columnar,
+            'compact': self.compact,
+            'pages': self.pages,
+        }
+        if kind == 'lines':
+            options.update({
+                'pipeline': self.pipeline.enabled,
+                'short_circuit': self.pipeline.short_circuit,
+                'children': self.children,
+                'templates': None if self.templates is None else self.templates.digest
+            })
+
+        return options
+
+    def get_cached(self, kind, options=None):
+        """
+        Get raw lines or processed lines from the cache. Return None if there is no cache or the lines are not cached.
+        The cache key has the options, by default the current options from get_cache_options.
+        """
+        if (self.cache is None) or (self.raw_lines_input is not None) or not self.document_url:
+            return None
+        if options is None:
+            options = self.get_cache_options(kind)
+        cached_lines = self.cache.get(self.content_hash, kind, options=options)
+        if cached_lines is not None:
+            self.close()
+
+        return cached_lines
+
+    def add_to_cache(self, kind, lines, options=None):
+        """
+        Add raw lines or processed lines to the cache, if there is a cache.
+        The cache key has the options, by default the current options from get_cache_options.
+        """
+        if (self.cache is None) or (self.raw_lines_input is not None) or not self.document_url:
+            return
+        if options is None:
+            options = self.get_cache_options(kind)
+        self.cache.put(self.content_hash, kind, lines, options=options)
+
+    def score_font_importance(self, lines):
+        """
+        Recalculate the font importance of the lines if custom weights are set.
+        """
+        if self.font_importance_weights is not None:
+            lines['font_importance'] = lines.calculate_font_importance(weights=self.font_importance_weights)
+
+        return lines
+
+    def compact_lines(self, lines):
+        """
+        Convert the lines to the compact schema if compact is set.
+        """
+        if self.compact:
+            return lines.compact()
+
+        return lines
 
     @cached_property
     def lines(self):
@@ -112,59 +417,113 @@ class Document:
         Process the raw lines to get the document content.
         """
         if self.lines_input is not None:
-            return Lines(self.lines_input)
+            return self.compact_lines(Lines(self.lines_input))
+
+        # Keyed by the options before processing, as processing can change the templates
+        cache_options = self.get_cache_options('lines')
+        cached_lines = self.get_cached('lines', options=cache_options)
+        if cached_lines is not None:
+            return cached_lines
 
-        if self.raw_lines is None:
+        raw_lines = self.run_stage('raw_lines', lambda: self.raw_lines)
+        if raw_lines is None:
             return None
 
-        lines = self.raw_lines.copy()
+        lines = self.clean_lines(raw_lines.copy())
+        self.learn_header_footer_templates()
 
-        # Merge inline texts # Add exclude_texts TODO
-        lines = lines.merge_inline_text()
+        # Get the structure
+        lines = self.run_stage('get_structure', self.get_structure, lines)
+        lines = self.run_stage('compact_lines', self.compact_lines, lines)
+        self.add_to_cache('lines', lines, options=cache_options)
 
-        # Sort lines by y of blocks
-        lines = lines.sort_blocks_by_y()
+        return lines
 
-        # Combine spans on same line with same styles
-        lines = lines.combine_spans_same_style()
+    def clean_lines(self, lines, repeating=None):
+        """
+        Merge and sort the spans of raw lines, and remove photos, headers and footers, and reference labels.
 
-        # Combine bullet points and lines
-        lines = lines.combine_bullet_spans()
+        Parameters
+        ----------
+        lines : Lines (required)
+            Raw lines of the document, or of consecutive pages of the document.
+
+        repeating : dict (default=None)
+            Texts of repeating headers and footers found on other pages, as in HeaderFooterEngine.repeating.
+            Updated with the repeating headers and footers found in these lines.
+        """
+        # Texts known to repeat before these lines, kept apart from the texts found in the passes over these lines
+        known_repeating = None
+        if repeating is not None:
+            known_repeating = {key: set(texts) for key, texts in repeating.items()}
+
+        return self.pipeline.run(
+            lines, run_stage=self.run_stage, known_repeating=known_repeating, repeating=repeating
+        )
+
+    def get_pipeline(self, preset='default', memoise=False):
+        """
+        Get the stages cleaning the raw lines of this document, in order.
+        Page labels, references, and repeating headers and footers are removed in two passes,
+        in case repeating headers or footers were below or above the page labels or references.
+        With the 'fast' preset, the second pass only runs if the first pass dropped repeating headers or footers,
+        which can keep page labels or references that the second pass would have removed.
+        Repeating headers and footers are only searched for if they do not match a header and footer template.
+
+        Parameters
+        ----------
+        preset : string (default='default')
+            'default' for all the stages, or 'fast' to skip photo blocks and date superscripts,
+            and the second pass when the first pass dropped no repeating headers or footers.
 
-        # Add text_base
+        memoise : bool (default=False)
+            Whether to memoise the output of each stage, as in Pipeline.
+        """
+        pipeline = Pipeline(memoise=memoise)\
+            .add('merge_inline_text', Lines.merge_inline_text)\
+            .add('sort_blocks_by_y', Lines.sort_blocks_by_y)\
+            .add('combine_spans_same_style', Lines.combine_spans_same_style)\
+            .add('combine_bullet_spans', Lines.combine_bullet_spans)\
+            .add('add_text_base', self.add_text_base)\
+            .add('remove_photo_blocks', self.remove_photo_blocks)\
+            .add('remove_page_labels_references', self.remove_page_labels_references)\
+            .add('apply_header_footer_templates', self.apply_header_footer_templates)\
+            .add(
+                'drop_repeating_headers_footers', self.drop_all_repeating_headers_footers,
+                run_unless_dropped='apply_header_footer_templates', options=['known_repeating', 'repeating']
+            )\
+            .add(
+                'remove_page_labels_references_again', self.remove_page_labels_references,
+                run_if_dropped=['apply_header_footer_templates', 'drop_repeating_headers_footers']
+            )\
+            .add(
+                'drop_repeating_headers_footers_again', self.drop_all_repeating_headers_footers,
+                run_if_dropped='remove_page_labels_references_again', options=['known_repeating', 'repeating']
+            )\
+            .add('remove_reference_labels', self.remove_reference_labels)\
+            .add('remove_date_superscripts', self.remove_date_superscripts)
+
+        return pipeline.use_preset(preset)
+
+    def add_text_base(self, lines):
+        """
+        Add the text in lower case with only letters, numbers, and single spaces, used to compare texts.
+        """
         lines['text_base'] = lines['text']\
             .str.replace(r'[^A-Za-z0-9 ]+', ' ', regex=True)\
             .str.replace(' +', ' ', regex=True)\
             .str.lower()\
             .str.strip()
 
-        # Remove photo blocks, page numbers, references
-        lines = self.remove_photo_blocks(lines=lines)
-        lines = self.remove_page_labels_references(lines=lines)
-        lines = self.drop_all_repeating_headers_footers(lines=lines)
-
-        # Have to run again in case repeating headers or footers were below or above the page labels or references
-        lines = self.remove_page_labels_references(lines=lines)
-        lines = self.drop_all_repeating_headers_footers(lines=lines)
-
-        # Remove reference numbers
-        lines = self.remove_reference_labels(lines=lines)
-
-        # Remove date superscript (th, st, etc)
-        lines = self.remove_date_superscripts(lines=lines)
-
-        # Get the structure
-        lines = self.get_structure(lines=lines)
-
         return lines
 
     def remove_photo_blocks(self, lines):
         """
         Remove blocks which look like photos from the document lines.
         """
-        lines['block_page'] = lines['block_number'].astype(str)+'_'+lines['page_number'].astype(str)
-        photo_blocks = lines.loc[lines['text'].astype(str).str.contains('Photo: '), 'block_page'].unique()
-        lines = lines.loc[~lines['block_page'].isin(photo_blocks)].drop(columns=['block_page'])
+        block_keys = lines.get_block_keys()
+        photo_blocks = block_keys.loc[lines['text'].astype(str).str.contains('Photo: ')].unique()
+        lines = lines.loc[~block_keys.isin(photo_blocks)]
 
         return lines
 
@@ -173,139 +532,95 @@ class Document:
         Remove page numbers from page headers and footers.
         Assumes headers and footers are the vertically highest and lowest elements on the page.
         """
-        for option in ['headers', 'footers']:
-
-            # For each page, get the order of the blocks by vertical y distance
-            ordered_blocks_by_page = lines\
-                .sort_values(
-                    by=['page_number', 'origin_y'],
-                    ascending=[True, (True if option == 'headers' else False)]
-                )\
-                .groupby('page_number')['block_number'].unique()
-
-            # Loop through pages
-            for page_number, block_numbers in ordered_blocks_by_page.items():
-                page_lines = lines.loc[lines['page_number'] == page_number]
-
-                # Loop through blocks and remove page labels and references
-                for block_number in block_numbers:
-
-                    block = page_lines.loc[page_lines['block_number'] == block_number]
-
-                    # Check if the whole block is a page label or reference
-                    # only for footers otherwise risk of dropping too much
-                    if option == 'footers':
-                        if block.is_page_label() or block.is_reference():
-                            lines.drop(labels=block.index, inplace=True)
-                            continue
-
-                    # Loop through lines and remove page numbers and references
-                    lines_page_label_or_reference = block.groupby(['line_number']).apply(
-                        lambda block_lines:
-                            block_lines.is_page_label() or block_lines.is_reference()
-                    )
-                    block_lines_to_drop = block.loc[
-                        block['line_number'].isin(lines_page_label_or_reference[lines_page_label_or_reference].index)
-                    ]
-                    lines.drop(labels=block_lines_to_drop.index, inplace=True)
-                    if lines_page_label_or_reference.all():
-                        continue
-
-                    break
+        engine = HeaderFooterEngine(lines)
+        engine.remove_page_labels_references()
 
-        return lines
+        return engine.lines
 
-    def drop_all_repeating_headers_footers(self, lines):
+    def drop_all_repeating_headers_footers(self, lines, known_repeating=None, repeating=None):
         """
         Drop all repeating headers and footers.
         Run until there are no more repeating headers or footers.
+        The headers and footers found are kept to be learned by the templates, if there are templates.
+
+        Parameters
+        ----------
+        lines : Lines (required)
+            Lines of the document in reading order, with a text_base column.
+
+        known_repeating : dict (default=None)
+            Texts known to repeat on other pages, as in HeaderFooterEngine.
+
+        repeating : dict (default=None)
+            If set, the repeating texts found are added to it.
         """
-        # Drop header blocks
-        while True:
-            repeating_blocks = self.get_repeating_blocks(which='top', lines=lines)
-            if repeating_blocks.empty:
-                break
-            lines = lines.drop(repeating_blocks['index'].explode())
-
-        # Drop header lines
-        while True:
-            repeating_lines = self.get_repeating_lines(which='top', lines=lines)
-            if repeating_lines.empty:
-                break
-            lines = lines.drop(repeating_lines['index'].explode())
-
-        # Drop footer blocks
-        while True:
-            repeating_blocks = self.get_repeating_blocks(which='bottom', lines=lines)
-            if repeating_blocks.empty:
-                break
-            lines = lines.drop(repeating_blocks['index'].explode())
-
-        # Drop footer lines
-        while True:
-            repeating_lines = self.get_repeating_lines(which='bottom', lines=lines)
-            if repeating_lines.empty:
-                break
-            lines = lines.drop(repeating_lines['index'].explode())
+        engine = HeaderFooterEngine(lines, known_repeating=known_repeating)
+        if engine.drop_repeating_headers_footers() and (self.templates is not None):
+            self.found_headers_footers.append(lines.loc[~engine.alive])
 
-        return lines
+        if repeating is not None:
+            for key, texts in engine.repeating.items():
+                repeating.setdefault(key, set()).update(texts)
+
+        return engine.lines
 
     def get_repeating_blocks(self, which, lines):
         """
-        Drop any repeating elements at the top or bottom of pages.
+        Get the top or bottom blocks of pages which have the same text on more than two pages,
+        with their text_base and the index labels of their rows, by page.
+        Deprecated: use HeaderFooterEngine.get_repeating_blocks.
         """
-        # Get spans in blocks at top of each page
-        lines['page_block'] = lines['page_number'].astype(str)+'_'+lines['block_number'].astype(str)
-
-        # Get the top and bottom blocks on each page
-        if which == 'top':
-            page_blocks = lines.loc[lines.groupby(['page_number'])['origin_y'].idxmin()]
-        elif which == 'bottom':
-            page_blocks = lines.loc[lines.groupby(['page_number'])['origin_y'].idxmax()]
-        else:
-            raise RuntimeError('Unrecognised value for "which", should be "top" or "bottom"')
+        warnings.warn(
+            'Document.get_repeating_blocks is deprecated, use HeaderFooterEngine.get_repeating_blocks',
+            DeprecationWarning, stacklevel=2
+        )
+        positions = HeaderFooterEngine(lines).get_repeating_blocks(which)
 
-        # Get repeating texts
-        elements = lines.loc[lines['page_block'].isin(page_blocks['page_block'].unique())]
-        elements = elements\
+        return lines.iloc[positions]\
+            .rename_axis('index')\
             .reset_index()\
             .groupby(['page_number'])\
             .agg({'text_base': lambda x: ' '.join(x), 'index': tuple})
-        elements = elements.loc[elements['text_base'].astype(bool)]
-        repeating_texts = elements\
-            .groupby(['text_base'])\
-            .filter(lambda x: len(x) > 2)
-
-        # Don't remove lessons learned or challenges titles # TODO
-
-        return repeating_texts
 
     def get_repeating_lines(self, which, lines):
         """
+        Get the top or bottom lines of pages which have the same text on more than two pages, not including bullets,
+        with the index labels of the rows in the "index" column.
+        Deprecated: use HeaderFooterEngine.get_repeating_lines.
         """
-        # Get the top and bottom lines on each page
-        if which == 'top':
-            page_lines = lines.loc[lines.groupby(['page_number'])['origin_y'].idxmin()]
-        elif which == 'bottom':
-            page_lines = lines.loc[lines.groupby(['page_number'])['origin_y'].idxmax()]
-        else:
-            raise RuntimeError('Unrecognised value for "which", should be "top" or "bottom"')
+        warnings.warn(
+            'Document.get_repeating_lines is deprecated, use HeaderFooterEngine.get_repeating_lines',
+            DeprecationWarning, stacklevel=2
+        )
+        positions = HeaderFooterEngine(lines).get_repeating_lines(which)
 
-        # Get repeating texts
-        page_lines = page_lines.loc[page_lines['text_base'].astype(bool)]
-        repeating_texts = page_lines\
-            .reset_index()\
-            .groupby(['text_base'])\
-            .filter(lambda x: len(x) > 2)
+        return lines.iloc[positions].rename_axis('index').reset_index()
 
-        # Don't remove lessons learned or challenges titles # TODO
+    def learn_header_footer_templates(self):
+        """
+        Learn the headers and footers dropped from the whole document, once, if there are templates.
+        """
+        if (self.templates is None) or self.templates_learned:
+            return
+        self.templates_learned = True
+        if self.found_headers_footers:
+            self.templates.learn(pd.concat(self.found_headers_footers))
+        self.found_headers_footers = []
+
+    def apply_header_footer_templates(self, lines):
+        """
+        Remove the lines matching a header and footer template, if there are templates.
+        """
+        if self.templates is None:
+            return lines
 
-        # Don't remove bullets
-        repeating_texts = repeating_texts.loc[~(
-            repeating_texts['text'].str.strip().isin(definitions.BULLETS)
-        )]
+        positions = self.templates.match(lines)
+        if positions is None:
+            return lines
+        keep = np.ones(len(lines), dtype=bool)
+        keep[positions] = False
 
-        return repeating_texts
+        return lines.loc[keep]
 
     def remove_reference_labels(self, lines):
         """
@@ -340,10 +655,154 @@ class Document:
     def headings(self):
         return self.lines.headings
 
-    def get_structure(self, lines):
+    def get_heading_index(self, abbreviations=None, index=None):
+        """
+        Index the headings of the document by their normalised text, to find sections by title.
+
+        Parameters
+        ----------
+        abbreviations : dict (default=None)
+            Phrases and lists of their abbreviations, e.g. {'lessons learned': ['lessons learnt']}.
+
+        index : HeadingIndex (default=None)
+            Index to add the headings to, e.g. an index of many documents. The headings are keyed by tuples of
+            the document label and the heading index. If None, a new index of this document is returned,
+            keyed by the heading index.
+        """
+        if index is not None:
+            return index.add_headings(self.headings, document=self.label)
+
+        return HeadingIndex(abbreviations=abbreviations).add_headings(self.headings)
+
+    def add_to_index(self, index, metadata=None):
+        """
+        Add the sections of the document to a SectionIndex, replacing them if the same PDF was added before.
+
+        Parameters
+        ----------
+        index : SectionIndex (required)
+            Index to add the sections to.
+
+        metadata : dict (default=None)
+            Values to filter documents by when searching the index, e.g. {'year': 2021}.
+        """
+        index.add_document(self.content_hash, self.to_sections(), source=self.label, metadata=metadata)
+
+    @cached_property
+    def sections(self):
+        """
+        Sections of the document in reading order, looked up by the index of their heading.
+        The lines and items of each section are only sliced when they are used.
+        """
+        return Sections(self.lines)
+
+    def to_sections(self):
+        """
+        Get the sections of the document: the text, level, page number, and items of each heading.
+        """
+        headings = self.headings
+        section_items = self.lines.to_range_items(headings['section_start'], headings['section_end'])
+        sections = []
+        for (index, heading), items in zip(headings.iterrows(), section_items):
+            sections.append({
+                'index': int(index),
+                'heading': heading['text'],
+                'level': int(heading['level']),
+                'page_number': int(heading['page_number']),
+                'items': items
+            })
+
+        return sections
+
+    def iter_raw_line_windows(self, window):
+        """
+        Iterate over the raw lines of the selected pages, window pages at a time.
+        The index of the lines continues from one window to the next, as in raw_lines.
+        Pages are extracted when they are reached and freed after they are yielded.
+        """
+        if self.raw_lines_input is not None:
+            raw_lines = self.raw_lines
+            page_numbers = sorted(raw_lines['page_number'].unique())
+            for start in range(0, len(page_numbers), window):
+                yield raw_lines.loc[raw_lines['page_number'].isin(page_numbers[start:start+window])]
+            return
+
+        page_numbers = self.select_pages(self.pages)
+        n_lines = 0
+        for start in range(0, len(page_numbers), window):
+            window_page_numbers = page_numbers[start:start+window]
+            raw_lines = self.extract_lines(window_page_numbers)
+            for page_number in window_page_numbers:
+                self.page_extractions.pop(page_number, None)
+            raw_lines.index = raw_lines.index + n_lines
+            n_lines += len(raw_lines)
+            yield raw_lines
+
+    def iter_sections(self, window=10):
+        """
+        Yield the sections of the document as soon as they are finished, processing window pages at a time.
+        Gives the same sections as to_sections when the window covers the whole document, in the order they finish.
+
+        Headers and footers are found within each window, and texts found to repeat are also removed from later pages.
+        The body text and heading levels are fixed from the first window.
+        Processed pages are freed, and only the lines of unfinished sections are kept.
+        The lines are not read from or added to the cache.
+
+        Parameters
+        ----------
+        window : int (default=10)
+            Number of pages processed at a time.
+
+        Yields
+        ------
+        section : dict
+            Index, heading, level, page number, and items of the section, as in to_sections.
+        """
+        if not self.document_url and (self.raw_lines_input is None):
+            return
+
+        repeating = {}
+        stream = None
+        try:
+            for raw_lines in self.iter_raw_line_windows(window):
+                if raw_lines.empty:
+                    continue
+                lines = self.clean_lines(raw_lines.copy(), repeating=repeating)
+                if lines.empty:
+                    continue
+                if stream is None:
+                    stream = SectionStream(lines['font_importance'])
+                yield from stream.add(lines)
+            self.learn_header_footer_templates()
+
+            if stream is not None:
+                yield from stream.close()
+        finally:
+            self.close()
+
+    def get_structure(self, lines, children=None):
         """
         Get the document structure in sections and subsections.
+        Each heading's section is the lines up to the next line with at least the same font importance.
+        Sections are stored as positional ranges in integer columns:
+
+        - section_start, section_end: positions of the first line of the section and of the first line after it,
+          so that the lines of the section are lines.iloc[section_start:section_end]. -1 for lines which are not headings.
+        - parent: index of the innermost heading containing the line, or -1 if the line is not in a section.
+        - depth: number of headings containing the line.
+
+        Parameters
+        ----------
+        lines : Lines (required)
+            Lines of the document, in reading order.
+
+        children : bool (default=None)
+            If True, also add the index labels of the lines of each heading's section as lists ("children").
+            This uses much more memory for deep documents. If None, uses the children option of the document.
         """
+        if children is None:
+            children = self.children
+
         # Calculate levels in the document, where 0 is body text, and higher number is higher heading
         levels = sorted(lines['font_importance'].unique())
         mode = lines['font_importance'].mode().iloc[0]
@@ -354,22 +813,42 @@ class Document:
         }
         lines['level'] = lines['font_importance'].map(levels_order)
 
-        # Get the children of each heading, i.e. the lines within that section
-        def get_next_bigger_heading(row):
-            children_lines = lines.loc[row.name:].iloc[1:]
-            next_big_headings = children_lines.loc[
-                (children_lines['font_importance'] >= row['font_importance'])
-            ]
-            if not next_big_headings.empty:
-                next_big_heading = next_big_headings.iloc[0]
-                children_lines = children_lines.loc[:next_big_heading.name].iloc[:-1]
-            return children_lines.index.tolist()
-
-        lines['children'] = lines.apply(
-            lambda row:
-                None if row.name not in lines.headings.index
-                else get_next_bigger_heading(row),
-            axis=1
-        )
+        # Get the section of each heading, i.e. the lines up to the next line with at least the same font importance
+        # Keep a stack of the open headings, which is always in decreasing order of font importance
+        n_lines = len(lines)
+        is_heading = lines.index.isin(lines.headings.index)
+        font_importance = lines['font_importance'].tolist()
+        section_end = [-1]*n_lines
+        parent = [-1]*n_lines
+        depth = [0]*n_lines
+        open_headings = []
+        for position, importance in enumerate(font_importance):
+
+            # Close the sections of headings which are not more important than this line
+            while open_headings and (font_importance[open_headings[-1]] <= importance):
+                section_end[open_headings.pop()] = position
+
+            if open_headings:
+                parent[position] = open_headings[-1]
+            depth[position] = len(open_headings)
+            if is_heading[position]:
+                open_headings.append(position)
+
+        # Sections still open continue to the end of the document
+        for heading_position in open_headings:
+            section_end[heading_position] = n_lines
+
+        # Parents are stored as index labels, so that they are kept when the lines are sliced
+        section_end = np.array(section_end, dtype=np.int64)
+        parent = np.array(parent, dtype=np.int64)
+        lines['section_start'] = np.where(is_heading, np.arange(n_lines, dtype=np.int64) + 1, -1)
+        lines['section_end'] = section_end
+        lines['parent'] = np.where(parent >= 0, lines.index.to_numpy()[np.maximum(parent, 0)], -1).astype(np.int64)
+        lines['depth'] = np.array(depth, dtype=np.int64)
+        if children:
+            index = lines.index
+            lines['children'] = pd.Series([
+                index[position+1:end].tolist() if end >= 0 else None for position, end in enumerate(section_end)
+            ], index=index, dtype='object')
 
         return lines
@@ -0,0 +1,404 @@
+"""
+Extract text spans from the pages of a PDF with PyMuPDF.
+"""
+import hashlib
+from array import array
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import fitz
+from pdf_structure_extractor.spatial import GridIndex
+from pdf_structure_extractor import utils
+
+# Columns kept by the columnar extraction, with the type code of their buffers (None for Python objects)
+# Coordinates and sizes are single precision as in PyMuPDF, total_y is double precision as it grows over the pages
+COLUMN_TYPES = {
+    'text': None,
+    'font': None,
+    'size': 'f',
+    'bold': 'b',
+    'color': None,
+    'highlight_color': None,
+    'page_number': 'i',
+    'block_number': 'i',
+    'line_number': 'i',
+    'span_number': 'i',
+    'origin_x': 'f',
+    'origin_y': 'f',
+    'total_y': 'd',
+    'img': 'b',
+    'bbox_x1': 'f',
+    'bbox_y1': 'f',
+    'bbox_x2': 'f',
+    'bbox_y2': 'f',
+}
+NUMPY_TYPES = {'f': np.float32, 'd': np.float64, 'i': np.int32, 'b': np.bool_}
+
+# Columns with few distinct values, stored as categoricals
+CATEGORICAL_COLUMNS = ['font', 'color']
+
+
+def iter_page_spans(page_layout):
+    """
+    Iterate over the text spans of a page, with their highlight colour and whether they are in an image.
+
+    Yields
+    ------
+    block_number, line_number, span_number : int
+        Position of the span on the page.
+
+    span : dict
+        Span as returned by PyMuPDF.
+
+    highlight_color : string
+        Hex colour of the drawing with the largest overlap with the span, or None.
+
+    img : bool
+        Whether the span is contained in an image.
+    """
+    # Get drawings to get text highlights
+    coloured_drawings = [
+        drawing
+        for drawing in page_layout.get_drawings()
+        if (drawing['fill'] != (0.0, 0.0, 0.0))
+    ]
+    page_images = page_layout.get_image_info()
+
+    # Index drawings and images by position so each span only checks those nearby
+    drawings_index = GridIndex([drawing['rect'] for drawing in coloured_drawings], page_layout.rect)
+    images_index = GridIndex([img['bbox'] for img in page_images], page_layout.rect)
+
+    # Loop through blocks
+    blocks = page_layout.get_text("dict", flags=11)["blocks"]
+    for block_number, block in enumerate(blocks):
+        for line_number, line in enumerate(block["lines"]):
+            spans = [span for span in line['spans'] if span['text'].strip()]
+            for span_number, span in enumerate(spans):
+
+                # Check if the text block is contained in a drawing
+                highlights = []
+                for drawing_position in drawings_index.query(span['bbox']):
+                    drawing = coloured_drawings[drawing_position]
+                    overlap = utils.get_overlap(span['bbox'], drawing['rect'])
+                    if overlap:
+                        drawing['overlap'] = overlap
+                        highlights.append(drawing)
+
+                # Get largest overlap
+                highlight_color_hex = None
+                if highlights:
+                    largest_highlight = max(highlights, key=lambda x: x['overlap'])
+                    highlight_color = largest_highlight['fill']
+                    if highlight_color:
+                        highlight_color_hex = '#%02x%02x%02x' % (
+                            int(255*highlight_color[0]),
+                            int(255*highlight_color[1]),
+                            int(255*highlight_color[2])
+                        )
+
+                # Check if the span is contained in any page images
+                contains_images = any(
+                    utils.contains(page_images[image_position]['bbox'], span['bbox'])
+                    for image_position in images_index.query(span['bbox'])
+                )
+
+                yield block_number, line_number, span_number, span, highlight_color_hex, contains_images
+
+
+def extract_page_spans(page_layout, page_number):
+    """
+    Extract the text spans from a page, with highlight colours and whether they are in an image.
+    The total_y of each span is the y position on the page, without the offset of previous pages.
+
+    Returns
+    -------
+    spans : list of dicts
+        Spans on the page, in block, line, and span order.
+
+    page_height : float
+        Height of the page, used to offset the spans on later pages.
+    """
+    data = []
+    for block_number, line_number, span_number, span, highlight_color, img in iter_page_spans(page_layout):
+        span['text'] = span['text'].replace('\r', '\n')
+        span['bold'] = ("black" in span['font'].lower()) or ("bold" in span['font'].lower())
+        span['color'] = "#%06x" % span['color']
+        span['highlight_color'] = highlight_color
+        span['page_number'] = page_number
+        span['block_number'] = block_number
+        span['line_number'] = line_number
+        span['span_number'] = span_number
+        span['origin_x'] = span['origin'][0]
+        span['origin_y'] = span['origin'][1]
+        span['total_y'] = span['origin'][1]
+        span['img'] = img
+        span['bbox_x1'] = span['bbox'][0]
+        span['bbox_y1'] = span['bbox'][1]
+        span['bbox_x2'] = span['bbox'][2]
+        span['bbox_y2'] = span['bbox'][3]
+        data.append(span)
+
+    return data, page_layout.rect.height
+
+
+def extract_page_columns(page_layout, page_number):
+    """
+    Extract the text spans from a page into typed column buffers, keeping only the columns in COLUMN_TYPES.
+    Gives the same values as extract_page_spans, without keeping the PyMuPDF span dicts.
+
+    Returns
+    -------
+    columns : dict
+        NumPy array of each column, or list for text columns.
+
+    page_height : float
+        Height of the page, used to offset the spans on later pages.
+    """
+    columns = {
+        column: [] if type_code is None else array(type_code)
+        for column, type_code in COLUMN_TYPES.items()
+    }
+    for block_number, line_number, span_number, span, highlight_color, img in iter_page_spans(page_layout):
+        values = {
+            'text': span['text'].replace('\r', '\n'),
+            'font': span['font'],
+            'size': span['size'],
+            'bold': ("black" in span['font'].lower()) or ("bold" in span['font'].lower()),
+            'color': "#%06x" % span['color'],
+            'highlight_color': highlight_color,
+            'page_number': page_number,
+            'block_number': block_number,
+            'line_number': line_number,
+            'span_number': span_number,
+            'origin_x': span['origin'][0],
+            'origin_y': span['origin'][1],
+            'total_y': span['origin'][1],
+            'img': img,
+            'bbox_x1': span['bbox'][0],
+            'bbox_y1': span['bbox'][1],
+            'bbox_x2': span['bbox'][2],
+            'bbox_y2': span['bbox'][3],
+        }
+        for column, value in values.items():
+            columns[column].append(value)
+
+    # Use the buffers as arrays without copying
+    for column, type_code in COLUMN_TYPES.items():
+        if type_code is not None:
+            columns[column] = np.frombuffer(columns[column], dtype=NUMPY_TYPES[type_code])
+
+    return columns, page_layout.rect.height
+
+
+def get_font_digest(doc, xref):
+    """
+    Get a hash of what the text of a font depends on: the font program, and the encoding and ToUnicode map
+    mapping its glyphs to text.
+    """
+    sha256 = hashlib.sha256()
+    sha256.update(doc.extract_font(xref)[3] or b'')
+    for key in ['Encoding', 'ToUnicode']:
+        value_type, value = doc.xref_get_key(xref, key)
+        if value_type == 'xref':
+            reference = int(value.split()[0])
+            if doc.xref_is_stream(reference):
+                sha256.update(doc.xref_stream(reference) or b'')
+            else:
+                sha256.update(doc.xref_object(reference, compressed=True).encode())
+        else:
+            sha256.update(value.encode())
+
+    return sha256.hexdigest()
+
+
+def get_page_fingerprint(page_layout, font_digests=None):
+    """
+    Get a hash of what the extracted spans of a page depend on: the page rectangle and rotation,
+    the content streams, the Form XObjects drawn on the page, the fonts used by the page, and the positions of
+    its images. Object numbers and the encoding of image data are not included, so the same page
+    in a re-published document has the same fingerprint.
+
+    Parameters
+    ----------
+    page_layout : pymupdf.Page (required)
+        Page to fingerprint.
+
+    font_digests : dict (default=None)
+        Digests of the fonts by xref, from get_font_digest, shared between the pages of a document
+        so that each font is only read once. Updated with the fonts of the page.
+    """
+    doc = page_layout.parent
+    if font_digests is None:
+        font_digests = {}
+    sha256 = hashlib.sha256()
+    sha256.update(repr((tuple(page_layout.rect), page_layout.rotation)).encode())
+    sha256.update(page_layout.read_contents())
+    for xref, name, _, _ in page_layout.get_xobjects():
+        sha256.update(name.encode())
+        sha256.update(doc.xref_stream(xref) or b'')
+    for font in page_layout.get_fonts():
+        if font[0] not in font_digests:
+            font_digests[font[0]] = get_font_digest(doc, font[0])
+        sha256.update(repr(font[1:]).encode())
+        sha256.update(font_digests[font[0]].encode())
+    for image in page_layout.get_image_info():
+        sha256.update(repr((image['bbox'], image['transform'])).encode())
+
+    return sha256.hexdigest()
+
+
+def set_page_number(page, page_number, columnar=False):
+    """
+    Set the page number of the spans of an extracted page, e.g. a page extracted from another version of the document.
+    The total_y of the spans is relative to the page, so it does not depend on the position of the page.
+    """
+    data, page_height = page
+    if columnar:
+        data['page_number'] = np.full(len(data['page_number']), page_number, dtype=NUMPY_TYPES['i'])
+    else:
+        for span in data:
+            span['page_number'] = page_number
+
+    return data, page_height
+
+
+def get_page_offsets(page_heights):
+    """
+    Get the total_y offset of each page: the total height of the previous pages.
+    """
+    return np.cumsum([0.0]+list(page_heights))[:-1]
+
+
+def stitch_pages(pages, offsets=None):
+    """
+    Combine the spans of pages into a DataFrame, offsetting total_y by the heights of the previous pages.
+    The span dicts are not changed, so pages can be stitched again.
+
+    Parameters
+    ----------
+    pages : iterable of tuples (required)
+        (spans, page_height) for each page, in page order, as returned by extract_page_spans.
+
+    offsets : list of floats (default=None)
+        Offset of each page. If None, the pages are assumed to be consecutive pages from the first page.
+    """
+    pages = list(pages)
+    if offsets is None:
+        offsets = get_page_offsets([page_height for _, page_height in pages])
+
+    data = pd.DataFrame([span for spans, _ in pages for span in spans])
+    if not data.empty:
+        data['total_y'] = data['total_y'] + np.repeat(offsets, [len(spans) for spans, _ in pages])
+
+    return data
+
+
+def stitch_page_columns(pages, offsets=None):
+    """
+    Combine the columns of pages into a DataFrame, offsetting total_y by the heights of the previous pages.
+
+    Parameters
+    ----------
+    pages : iterable of tuples (required)
+        (columns, page_height) for each page, in page order, as returned by extract_page_columns.
+
+    offsets : list of floats (default=None)
+        Offset of each page. If None, the pages are assumed to be consecutive pages from the first page.
+    """
+    pages = list(pages)
+    if offsets is None:
+        offsets = get_page_offsets([page_height for _, page_height in pages])
+
+    data = {}
+    for column, type_code in COLUMN_TYPES.items():
+        page_columns = [columns[column] for columns, _ in pages]
+        if type_code is None:
+            values = [value for page_column in page_columns for value in page_column]
+            if column in CATEGORICAL_COLUMNS:
+                values = pd.Categorical(values)
+            else:
+                values = np.array(values, dtype=object)
+        elif page_columns:
+            values = np.concatenate(page_columns)
+        else:
+            values = np.array([], dtype=NUMPY_TYPES[type_code])
+        data[column] = values
+
+    # Offset the y positions by the previous pages
+    page_sizes = [len(columns['text']) for columns, _ in pages]
+    data['total_y'] = data['total_y'] + np.repeat(offsets, page_sizes)
+
+    return pd.DataFrame(data, copy=False)
+
+
+# PDF opened by each worker process in the pool
+_worker_doc = None
+
+
+def _open_worker_document(source):
+    global _worker_doc
+    if isinstance(source, str):
+        _worker_doc = fitz.open(source, filetype='pdf')
+    else:
+        _worker_doc = fitz.open(stream=source, filetype='pdf')
+
+
+def _extract_worker_pages(page_numbers, columnar=False):
+    extract_page = extract_page_columns if columnar else extract_page_spans
+    return [
+        extract_page(_worker_doc[page_number], page_number)
+        for page_number in page_numbers
+    ]
+
+
+def extract_pages_parallel(source, page_count, workers, chunks_per_worker=4, columnar=False, page_numbers=None):
+    """
+    Extract the spans of all pages, or of the selected pages, in a pool of processes.
+    Each worker opens the PDF once, and extracts contiguous ranges of pages.
+
+    Parameters
+    ----------
+    source : string or bytes (required)
+        Path to the PDF, or the content of the PDF.
+
+    page_count : int (required)
+        Number of pages in the PDF.
+
+    workers : int (required)
+        Number of worker processes.
+
+    chunks_per_worker : int (default=4)
+        Number of page ranges to split the work into for each worker, to balance uneven pages.
+
+    columnar : bool (default=False)
+        If True, extract each page with extract_page_columns instead of extract_page_spans.
+
+    page_numbers : list of ints (default=None)
+        Pages to extract, in order. If None, all pages are extracted.
+
+    Returns
+    -------
+    pages : list of tuples
+        (spans, page_height) or (columns, page_height) for each page, in the order of page_numbers.
+    """
+    if page_numbers is None:
+        page_numbers = range(page_count)
+    page_numbers = list(page_numbers)
+    n_chunks = max(min(workers*chunks_per_worker, len(page_numbers)), 1)
+    chunk_size = max(-(-len(page_numbers) // n_chunks), 1)
+    chunks = [
+        page_numbers[start:start+chunk_size]
+        for start in range(0, len(page_numbers), chunk_size)
+    ]
+
+    pages = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_open_worker_document,
+        initargs=(source,)
+    ) as executor:
+        for chunk_pages in executor.map(partial(_extract_worker_pages, columnar=columnar), chunks):
+            pages.extend(chunk_pages)
+
+    return pages
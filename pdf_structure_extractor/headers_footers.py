@@ -0,0 +1,462 @@
+"""
+Remove page labels, references, and repeating headers and footers from the lines of a document.
+"""
+import os
+import re
+import json
+import hashlib
+import tempfile
+from collections import defaultdict
+import numpy as np
+from pdf_structure_extractor import matchers
+
+
+def is_missing(value):
+    return (value is None) or (value != value)
+
+
+class HeaderFooterEngine:
+    def __init__(self, lines, known_repeating=None):
+        """
+        Index of the elements at the top and bottom of each page, used to remove headers and footers.
+        The lines are grouped and sorted once, and elements are marked as dropped rather than removed,
+        so repeated passes only look at the current top and bottom of each page.
+
+        Parameters
+        ----------
+        lines : Lines (required)
+            Lines of the document in reading order, with a text_base column.
+
+        known_repeating : dict (default=None)
+            Texts known to repeat from other pages of the document, e.g. earlier pages when streaming,
+            as returned in the repeating attribute. Top and bottom elements with these texts are dropped
+            even if they are not repeated in these lines.
+        """
+        self.input_lines = lines
+        self.known_repeating = known_repeating or {}
+
+        # Texts of the repeating elements found, by kind ('blocks' or 'lines') and position ('top' or 'bottom')
+        self.repeating = {(kind, which): set() for kind in ['blocks', 'lines'] for which in ['top', 'bottom']}
+        self.alive = np.ones(len(lines), dtype=bool)
+
+        self.page_number = lines['page_number'].tolist()
+        self.block_number = lines['block_number'].tolist()
+        self.line_number = lines['line_number'].tolist()
+        self.span_number = lines['span_number'].tolist()
+        self.text = lines['text'].tolist()
+        self.text_base = lines['text_base'].tolist()
+        self.size = lines['size'].tolist()
+
+        # Positions of the rows in each page and each block, in reading order
+        self.page_rows = defaultdict(list)
+        self.block_rows = defaultdict(list)
+        for position, (page_number, block_number) in enumerate(zip(self.page_number, self.block_number)):
+            self.page_rows[page_number].append(position)
+            self.block_rows[(page_number, block_number)].append(position)
+        self.pages = sorted(self.page_rows)
+
+        # Positions of the rows in each page from the top and from the bottom
+        # Ties are kept in reading order, and rows with no y position are last
+        origin_y = lines['origin_y'].to_numpy(dtype=float)
+        self.page_order = {'top': {}, 'bottom': {}}
+        for page_number, positions in self.page_rows.items():
+            positions = np.array(positions)
+            page_y = origin_y[positions]
+            self.page_order['top'][page_number] = positions[
+                np.lexsort((positions, np.isnan(page_y), page_y))
+            ].tolist()
+            self.page_order['bottom'][page_number] = positions[
+                np.lexsort((positions, np.isnan(page_y), -page_y))
+            ].tolist()
+        self.page_order_start = {'top': defaultdict(int), 'bottom': defaultdict(int)}
+
+        # Joined text_base of each block, removed from the cache when rows of the block are dropped
+        self.block_texts = {}
+
+    @property
+    def lines(self):
+        """
+        Get the lines which have not been dropped.
+        """
+        return self.input_lines.loc[self.alive]
+
+    def drop(self, positions):
+        """
+        Mark rows as dropped. Return the number of rows dropped.
+        """
+        positions = [position for position in positions if self.alive[position]]
+        for position in positions:
+            self.alive[position] = False
+            self.block_texts.pop((self.page_number[position], self.block_number[position]), None)
+
+        return len(positions)
+
+    def get_extremity(self, page_number, which):
+        """
+        Get the position of the highest or lowest remaining row of a page.
+        Return None if all rows of the page have been dropped.
+        """
+        if which not in ['top', 'bottom']:
+            raise RuntimeError('Unrecognised value for "which", should be "top" or "bottom"')
+        order = self.page_order[which][page_number]
+        start = self.page_order_start[which][page_number]
+        while (start < len(order)) and not self.alive[order[start]]:
+            start += 1
+        self.page_order_start[which][page_number] = start
+        if start < len(order):
+            return order[start]
+
+    def get_block(self, page_number, block_number):
+        """
+        Get the positions of the remaining rows in a block, in reading order.
+        """
+        return [position for position in self.block_rows[(page_number, block_number)] if self.alive[position]]
+
+    def get_block_text(self, page_number, block_number):
+        """
+        Get the text_base of the remaining rows in a block, joined with spaces.
+        """
+        key = (page_number, block_number)
+        if key not in self.block_texts:
+            self.block_texts[key] = ' '.join(
+                self.text_base[position] for position in self.get_block(page_number, block_number)
+            )
+
+        return self.block_texts[key]
+
+    def sort_by_line(self, positions):
+        """
+        Sort rows by line and span number, dropping rows with no text_base.
+        """
+        positions = [position for position in positions if not is_missing(self.text_base[position])]
+        return sorted(positions, key=lambda position: (self.line_number[position], self.span_number[position]))
+
+    def is_page_label(self, positions):
+        """
+        Check if rows are a page label. Same as Lines.is_page_label.
+        """
+        positions = self.sort_by_line(positions)
+        if not positions:
+            return False
+
+        # If the the first word is page, assume page label
+        texts_with_chars = [
+            self.text_base[position]
+            for position in positions
+            if re.search('[a-z]', str(self.text_base[position]))
+        ]
+        if texts_with_chars:
+            if texts_with_chars[0].startswith('page'):
+                return True
+
+        # If only a single number, assume page label
+        if len(positions) == 1 and self.text_base[positions[0]].isdigit():
+            return True
+
+        # If only contains "page" and number, assume page label
+        combined_text_chars_no_numbers = re.sub(r'[0-9]', '', ' '.join(texts_with_chars))
+        if not combined_text_chars_no_numbers.replace('page', '').strip():
+            return True
+
+        return False
+
+    def is_reference(self, positions):
+        """
+        Check if rows are a reference denoted by a superscript number. Same as Lines.is_reference.
+        """
+        positions = self.sort_by_line(positions)
+        if not positions:
+            return False
+
+        # If the first span is small and a number
+        first_position = positions[0]
+        if self.text_base[first_position].isdigit():
+            if len(positions) == 1:
+                return True
+            if (self.size[positions[1]] - self.size[first_position]) >= 1:
+                return True
+
+        return False
+
+    def remove_page_labels_references(self):
+        """
+        Remove page numbers and references from page headers and footers.
+        Assumes headers and footers are the vertically highest and lowest elements on the page.
+        Return the number of rows dropped.
+        """
+        dropped = 0
+        for option, which in [('headers', 'top'), ('footers', 'bottom')]:
+            for page_number in self.pages:
+
+                # Get the order of the remaining blocks by vertical y distance
+                block_numbers = list(dict.fromkeys(
+                    self.block_number[position]
+                    for position in self.page_order[which][page_number]
+                    if self.alive[position]
+                ))
+
+                # Loop through blocks and remove page labels and references
+                for block_number in block_numbers:
+                    block = self.get_block(page_number, block_number)
+
+                    # Check if the whole block is a page label or reference
+                    # only for footers otherwise risk of dropping too much
+                    if option == 'footers':
+                        if self.is_page_label(block) or self.is_reference(block):
+                            dropped += self.drop(block)
+                            continue
+
+                    # Loop through lines and remove page numbers and references
+                    block_lines = defaultdict(list)
+                    for position in block:
+                        block_lines[self.line_number[position]].append(position)
+                    lines_page_label_or_reference = [
+                        self.is_page_label(line_positions) or self.is_reference(line_positions)
+                        for line_positions in block_lines.values()
+                    ]
+                    for line_positions, page_label_or_reference in zip(
+                        block_lines.values(), lines_page_label_or_reference
+                    ):
+                        if page_label_or_reference:
+                            dropped += self.drop(line_positions)
+                    if all(lines_page_label_or_reference):
+                        continue
+
+                    break
+
+        return dropped
+
+    def get_repeating_blocks(self, which):
+        """
+        Get the rows of the top or bottom blocks of pages which have the same text on more than two pages.
+        """
+        page_blocks = defaultdict(list)
+        for page_number in self.pages:
+            position = self.get_extremity(page_number, which)
+            if position is None:
+                continue
+            block_number = self.block_number[position]
+            text = self.get_block_text(page_number, block_number)
+            if text:
+                page_blocks[text].append(self.get_block(page_number, block_number))
+
+        known_texts = self.known_repeating.get(('blocks', which), ())
+        repeating_texts = [text for text, blocks in page_blocks.items() if (len(blocks) > 2) or (text in known_texts)]
+        self.repeating[('blocks', which)].update(repeating_texts)
+
+        return [
+            position
+            for text in repeating_texts
+            for block in page_blocks[text]
+            for position in block
+        ]
+
+    def get_repeating_lines(self, which):
+        """
+        Get the top or bottom rows of pages which have the same text on more than two pages.
+        Bullets are not included.
+        """
+        page_lines = defaultdict(list)
+        for page_number in self.pages:
+            position = self.get_extremity(page_number, which)
+            if position is None:
+                continue
+            text_base = self.text_base[position]
+            if text_base and not is_missing(text_base):
+                page_lines[text_base].append(position)
+
+        known_texts = self.known_repeating.get(('lines', which), ())
+        repeating_texts = [
+            text for text, positions in page_lines.items() if (len(positions) > 2) or (text in known_texts)
+        ]
+        self.repeating[('lines', which)].update(repeating_texts)
+
+        return [
+            position
+            for text in repeating_texts
+            for position in page_lines[text]
+            if str(self.text[position]).strip() not in matchers.BULLET_CHARACTERS
+        ]
+
+    def drop_repeating_headers_footers(self):
+        """
+        Drop repeating header blocks, header lines, footer blocks, and footer lines.
+        Each is run until there are no more repeating elements. Return the number of rows dropped.
+        """
+        dropped = 0
+        for which, get_repeating in [
+            ('top', self.get_repeating_blocks),
+            ('top', self.get_repeating_lines),
+            ('bottom', self.get_repeating_blocks),
+            ('bottom', self.get_repeating_lines),
+        ]:
+            while True:
+                repeating = get_repeating(which)
+                if not repeating:
+                    break
+                dropped += self.drop(repeating)
+
+        return dropped
+
+
+class HeaderFooterTemplates:
+    def __init__(self, path=None, band=5, min_page_fraction=0.5, extremity_rows=3):
+        """
+        Signatures of the repeating headers and footers learned from processed documents,
+        e.g. the running headers of one report type, used to remove them from new documents directly.
+        A signature is the text_base, the band of vertical position on the page, and the style of a line.
+        Each template is the signatures of the headers and footers of similar documents.
+
+        Parameters
+        ----------
+        path : string (default=None)
+            JSON file to load the templates from and save them to when they are learned.
+            If None, the templates are only kept in memory.
+
+        band : float (default=5)
+            Height of the vertical position bands in points. Lines in neighbouring bands also match.
+            Templates loaded from a file keep the band they were learned with.
+
+        min_page_fraction : float (default=0.5)
+            Fraction of the pages of a document which must have a line matching a template to use the template.
+
+        extremity_rows : int (default=3)
+            Number of the highest and of the lowest rows of each page which can match a template,
+            so that body text with the same text and position as a header or footer is kept.
+        """
+        self.path = None if path is None else os.fspath(path)
+        self.band = band
+        self.min_page_fraction = min_page_fraction
+        self.extremity_rows = extremity_rows
+        self.templates = []
+        if (self.path is not None) and os.path.exists(self.path):
+            with open(self.path) as file:
+                saved = json.load(file)
+            self.band = saved['band']
+            self.templates = [
+                {'signatures': {tuple(signature) for signature in template['signatures']},
+                 'documents': template['documents']}
+                for template in saved['templates']
+            ]
+
+    def __len__(self):
+        return len(self.templates)
+
+    @property
+    def digest(self):
+        """
+        Get a short hash of the templates and the settings which change the lines matched, e.g. for cache keys.
+        """
+        return hashlib.sha256(json.dumps([
+            self.band, self.min_page_fraction, self.extremity_rows,
+            sorted(sorted(template['signatures']) for template in self.templates)
+        ]).encode()).hexdigest()[:16]
+
+    def get_extremities(self, lines):
+        """
+        Get a mask of the extremity_rows highest and lowest rows of each page, the rows which can match a template.
+        Rows with no y position are not included.
+        """
+        page_number = lines['page_number'].to_numpy()
+        origin_y = lines['origin_y'].to_numpy(dtype=float)
+        positions = np.arange(len(lines))
+        has_y = ~np.isnan(origin_y)
+        extremities = np.zeros(len(lines), dtype=bool)
+        for y in [origin_y, -origin_y]:
+            # Rank of each row from the top or from the bottom of its page
+            order = np.lexsort((positions, y, page_number))
+            order = order[has_y[order]]
+            order_pages = page_number[order]
+            page_starts = np.flatnonzero(np.r_[True, order_pages[1:] != order_pages[:-1]])
+            ranks = np.arange(len(order)) - np.repeat(page_starts, np.diff(np.r_[page_starts, len(order)]))
+            extremities[order[ranks < self.extremity_rows]] = True
+
+        return extremities
+
+    def get_signatures(self, lines):
+        """
+        Get the signature of each line: text_base, vertical position band, and style.
+        """
+        bands = np.floor(lines['origin_y'].to_numpy(dtype=float)/self.band)
+        return [
+            (text_base, int(band), str(style))
+            for text_base, band, style in zip(lines['text_base'], np.nan_to_num(bands, nan=-1), lines['style'])
+        ]
+
+    def match(self, lines):
+        """
+        Find the template matching the most pages of the lines. Only the highest and lowest rows of each page can match.
+        Return the positions of the lines matching the template, or None if no template matches enough pages.
+        """
+        if not self.templates or lines.empty:
+            return None
+
+        signatures = self.get_signatures(lines)
+        extremities = self.get_extremities(lines)
+        page_number = lines['page_number'].to_numpy()
+        n_pages = len(np.unique(page_number))
+        best_positions, best_pages = None, 0
+        for template in self.templates:
+            template_signatures = self.get_matching_signatures(template)
+            positions = np.array([
+                position for position, signature in enumerate(signatures)
+                if extremities[position] and (signature in template_signatures)
+            ], dtype=int)
+            pages = len(np.unique(page_number[positions]))
+            if (pages > best_pages) and (pages >= self.min_page_fraction*n_pages):
+                best_positions, best_pages = positions, pages
+
+        return best_positions
+
+    def get_matching_signatures(self, template):
+        """
+        Get the signatures matching a template, including the neighbouring bands. Cached until the template changes.
+        """
+        if 'matching_signatures' not in template:
+            template['matching_signatures'] = {
+                (text_base, band + offset, style)
+                for text_base, band, style in template['signatures']
+                for offset in (-1, 0, 1)
+            }
+
+        return template['matching_signatures']
+
+    def learn(self, lines):
+        """
+        Add the signatures of repeating header and footer lines found in a document.
+        They are added to the template sharing most of their signatures, or to a new template.
+        """
+        signatures = {
+            signature for signature in self.get_signatures(lines) if isinstance(signature[0], str) and signature[0]
+        }
+        if not signatures:
+            return
+
+        overlaps = [len(signatures & template['signatures']) for template in self.templates]
+        if overlaps and (max(overlaps) >= len(signatures)/2):
+            template = self.templates[int(np.argmax(overlaps))]
+            template['signatures'] |= signatures
+            template['documents'] += 1
+            template.pop('matching_signatures', None)
+        else:
+            self.templates.append({'signatures': signatures, 'documents': 1})
+
+        if self.path is not None:
+            self.save()
+
+    def save(self):
+        """
+        Write the templates to the JSON file, replacing it at once so that readers never see a partial file.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                json.dump({'band': self.band, 'templates': [
+                    {'signatures': sorted(template['signatures']), 'documents': template['documents']}
+                    for template in self.templates
+                ]}, file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
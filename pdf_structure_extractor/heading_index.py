@@ -0,0 +1,123 @@
+"""
+Index of the headings of one or many documents, to find sections by title with abbreviations.
+"""
+import re
+from collections import defaultdict
+from pdf_structure_extractor import matchers
+
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^a-z0-9 ]+')
+
+
+def normalise_title(text, abbreviation_matcher=None, remove_filler_words=True):
+    """
+    Get the text used to compare titles: lower case, with abbreviations rewritten to their canonical form,
+    no punctuation, and optionally no filler words.
+    """
+    text = str(text).lower()
+    if abbreviation_matcher is not None:
+        text = abbreviation_matcher.canonicalise(text)
+    text = NON_ALPHANUMERIC_PATTERN.sub(' ', text)
+    if remove_filler_words:
+        text = matchers.FILLER_WORDS_MATCHER.replace('', text)
+    return matchers.MULTIPLE_SPACES_PATTERN.sub(' ', text).strip()
+
+
+def series_normalise_title(texts, abbreviation_matcher=None, remove_filler_words=True):
+    """
+    Get the text used to compare titles for each text in a Series. Same as normalise_title.
+    """
+    texts = texts.astype(str).str.lower()
+    if abbreviation_matcher is not None:
+        texts = abbreviation_matcher.series_canonicalise(texts)
+    texts = texts.str.replace(NON_ALPHANUMERIC_PATTERN, ' ', regex=True)
+    if remove_filler_words:
+        texts = matchers.FILLER_WORDS_MATCHER.series_replace('', texts)
+
+    return texts.str.replace(matchers.MULTIPLE_SPACES_PATTERN, ' ', regex=True).str.strip()
+
+
+class HeadingIndex:
+    def __init__(self, abbreviations=None, remove_filler_words=True):
+        """
+        Index of headings by their normalised text: lower case, with abbreviations rewritten to one canonical form,
+        no punctuation, and optionally no filler words. Headings are found with dictionary lookups,
+        so a query does not depend on the number of headings or generate variations of the title.
+
+        Parameters
+        ----------
+        abbreviations : dict (default=None)
+            Phrases and lists of their abbreviations, as in matchers.AbbreviationMatcher,
+            e.g. {'planning monitoring evaluation and reporting': ['pmer']}.
+
+        remove_filler_words : bool (default=True)
+            Whether to ignore filler words ("and", "the", etc.) when comparing titles.
+        """
+        self.abbreviation_matcher = matchers.AbbreviationMatcher(abbreviations or {})
+        self.remove_filler_words = remove_filler_words
+
+        # Keys of the headings by normalised text, and the normalised texts containing each word, in the order added
+        self.headings = defaultdict(list)
+        self.words = defaultdict(dict)
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.headings.values())
+
+    def normalise(self, text):
+        """
+        Get the normalised text used to compare titles.
+        """
+        return normalise_title(text, self.abbreviation_matcher, remove_filler_words=self.remove_filler_words)
+
+    def add(self, text, key):
+        """
+        Add a heading, identified by key, e.g. the index of the heading or a tuple of the document and the index.
+        """
+        self.add_normalised(self.normalise(text), key)
+
+    def add_normalised(self, normalised, key):
+        """
+        Add a heading by its normalised text, from normalise.
+        """
+        self.headings[normalised].append(key)
+        for word in normalised.split():
+            self.words[word][normalised] = None
+
+    def add_headings(self, headings, document=None):
+        """
+        Add the headings of a document, e.g. Document.headings.
+        The keys are the index of each heading, or tuples of document and index if document is set.
+        The headings are normalised together.
+        """
+        texts = headings['text'].loc[headings['text'].notna()]
+        normalised = series_normalise_title(
+            texts, self.abbreviation_matcher, remove_filler_words=self.remove_filler_words
+        )
+        for index, text in zip(texts.index, normalised):
+            self.add_normalised(text, index if document is None else (document, index))
+
+        return self
+
+    def get(self, title):
+        """
+        Get the keys of the headings with the same normalised text as the title.
+        """
+        return list(self.headings.get(self.normalise(title), []))
+
+    def search(self, phrase):
+        """
+        Get the keys of the headings which contain the normalised phrase as whole words.
+        Only the headings with the rarest word of the phrase are compared.
+        """
+        normalised = self.normalise(phrase)
+        words = normalised.split()
+        if not words:
+            return []
+
+        candidates = min((self.words.get(word, {}) for word in words), key=len)
+        padded = ' {} '.format(normalised)
+        keys = []
+        for text in candidates:
+            if padded in ' {} '.format(text):
+                keys.extend(self.headings[text])
+
+        return keys
@@ -2,8 +2,50 @@
 """
 import re
 from functools import cached_property
+import numpy as np
 import pandas as pd
-from pdf_structure_extractor import utils, definitions
+from pdf_structure_extractor import utils, definitions, matchers
+
+
+def get_previous_in_sections(values, new_section, fill_value=np.nan):
+    """
+    Get the value of the previous line in the same section, or fill_value for the first line of each section.
+    A fill_value of the same type as the values keeps their dtype, e.g. False for a boolean column.
+    """
+    return values.shift(1, fill_value=fill_value).where(~new_section, fill_value)
+
+
+def join_groups(texts, codes, n_groups, sep=' '):
+    """
+    Join the texts of each group with one string join for all groups, rather than one join per group.
+
+    Parameters
+    ----------
+    texts : list of strings (required)
+        Texts, sorted by group.
+
+    codes : array of ints (required)
+        Group of each text, from 0 to n_groups - 1, in increasing order.
+
+    n_groups : int (required)
+        Number of groups. Groups with no texts are joined to an empty string.
+
+    sep : string (default=' ')
+        Separator between the texts of a group.
+    """
+    joined = sep.join(texts)
+
+    # Each group is the slice of the joined text from the start of its first text to the end of its last text
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    ends = np.cumsum(lengths + len(sep)) - len(sep)
+    starts = ends - lengths
+    first = np.searchsorted(codes, np.arange(n_groups), side='left')
+    last = np.searchsorted(codes, np.arange(n_groups), side='right') - 1
+
+    return [
+        joined[starts[first_position]:ends[last_position]] if first_position <= last_position else ''
+        for first_position, last_position in zip(first, last)
+    ]
 
 
 class Line(pd.Series):
@@ -16,19 +58,27 @@ class Line(pd.Series):
     def _constructor_expanddim(self):
         return Lines
 
-    def calculate_font_importance(self):
+    def calculate_font_importance(self, weights=None):
         """
+        Calculate the font importance of the line from the fontsize, boldness, and uppercase.
+
+        Parameters
+        ----------
+        weights : dict (default=None)
+            Weights of 'size', 'bold', and 'uppercase' in the score. Missing weights are taken from the defaults.
         """
+        weights = {**definitions.FONT_IMPORTANCE_WEIGHTS, **(weights or {})}
+
         # Fontsize is the most important
-        title_score = self['double_fontsize_int']*100
+        title_score = self['double_fontsize_int']*weights['size']
 
         # Fontweight less important than fontsize
         if self['bold']:
-            title_score += 10
+            title_score += weights['bold']
 
         # Uppercase is least important
         if self['text'].isupper():
-            title_score += 1
+            title_score += weights['uppercase']
 
         return title_score
 
@@ -74,37 +124,104 @@ class Line(pd.Series):
 
 
 class Lines(pd.DataFrame):
+
+    # Columns derived from the extracted columns: (column, columns required to calculate it, method to calculate it)
+    # Derived columns are only calculated when missing, so they are carried through slices and copies
+    derived_columns = [
+        ('double_fontsize_int', ['size'], 'calculate_double_fontsize_int'),
+        ('style', ['font', 'double_fontsize_int', 'color', 'highlight_color'], 'calculate_style'),
+        ('font_importance', ['double_fontsize_int', 'bold', 'text'], 'calculate_font_importance'),
+    ]
+
+    # Columns converted by compact: strings with few distinct values to categoricals, and numbers to 32 bits
+    # total_y is kept in double precision, as it grows over the pages of the document
+    compact_categorical_columns = ['font', 'style', 'color', 'highlight_color']
+    compact_float_columns = ['size', 'origin_x', 'origin_y', 'bbox_x1', 'bbox_y1', 'bbox_x2', 'bbox_y2']
+    compact_integer_columns = [
+        'page_number', 'block_number', 'line_number', 'span_number',
+        'double_fontsize_int', 'font_importance', 'level', 'section_start', 'section_end', 'parent', 'depth'
+    ]
+
     def __init__(self, *args, **kwargs):
         super(Lines,  self).__init__(*args, **kwargs)
+        self.add_derived_columns()
 
-        # Add integer fontsize (double to keep half sizes)
-        if 'size' in self.columns:
-            if 'double_fontsize_int' not in self.columns:
-                self['double_fontsize_int'] = (self['size'].astype(float)*2).round(0).astype('Int64')
-
-        # Add style string
-        if (
-            ('font' in self.columns) and
-            ('double_fontsize_int' in self.columns) and
-            ('color' in self.columns) and
-            ('highlight_color' in self.columns)
-        ):
-            self['style'] = self['font'].str.lower().str.split(pat='-', n=1).str[-1].replace({'boldmt': 'bold'})+', ' +\
-                            self['double_fontsize_int'].astype(str)+', ' +\
-                            self['color'].astype(str)+', ' +\
-                            self['highlight_color'].astype(str)
-
-        # Add font importance based on size, boldness, and uppercase, and level
-        if (
-            ('double_fontsize_int' in self.columns) and
-            ('bold' in self.columns) and
-            ('text' in self.columns) and
-            ('font_importance' not in self.columns)
-        ):
-            self['font_importance'] = self.apply(
-                lambda row: row.calculate_font_importance(),
-                axis=1
-            )
+    def add_derived_columns(self):
+        """
+        Add any derived columns which are missing and can be calculated from the other columns.
+        """
+        for column, required_columns, method in self.derived_columns:
+            if column in self.columns:
+                continue
+            if all(required_column in self.columns for required_column in required_columns):
+                self[column] = getattr(self, method)()
+
+    def compact(self):
+        """
+        Get a copy of the lines with a compact schema, to hold many documents in memory.
+        Strings with few distinct values become categoricals, and numbers are downcast to 32 bits.
+        """
+        lines = self.copy()
+        for column in self.compact_categorical_columns:
+            if column in lines.columns:
+                lines[column] = lines[column].astype('category')
+        for column in self.compact_float_columns:
+            if (column in lines.columns) and (lines[column].dtype == 'float64'):
+                lines[column] = lines[column].astype('float32')
+        for column in self.compact_integer_columns:
+            if column not in lines.columns:
+                continue
+            if lines[column].dtype == 'int64':
+                lines[column] = lines[column].astype('int32')
+            elif lines[column].dtype == 'Int64':
+                lines[column] = lines[column].astype('Int32')
+
+        return lines
+
+    def get_block_keys(self):
+        """
+        Get an integer key of the block of each line, unique across pages.
+        The key is page_number * (maximum block_number + 1) + block_number.
+        """
+        block_count = int(self['block_number'].max())+1 if len(self) else 1
+
+        return self['page_number'].astype('int64')*block_count + self['block_number'].astype('int64')
+
+    def calculate_double_fontsize_int(self):
+        """
+        Get the integer fontsize (double to keep half sizes).
+        """
+        return (self['size'].astype(float)*2).round(0).astype('Int64')
+
+    def calculate_style(self):
+        """
+        Get a string representing the style of the text: font, size, color, and highlight color.
+        """
+        return self['font'].str.lower().str.split(pat='-', n=1).str[-1].replace({'boldmt': 'bold'})+', ' +\
+            self['double_fontsize_int'].astype(str)+', ' +\
+            self['color'].astype(str)+', ' +\
+            self['highlight_color'].astype(object).where(self['highlight_color'].notna(), None).astype(str)
+
+    def calculate_font_importance(self, weights=None):
+        """
+        Get the font importance based on size, boldness, and uppercase.
+        Gives the same scores as Line.calculate_font_importance, calculated over whole columns.
+
+        Parameters
+        ----------
+        weights : dict (default=None)
+            Weights of 'size', 'bold', and 'uppercase' in the score. Missing weights are taken from the defaults.
+        """
+        weights = {**definitions.FONT_IMPORTANCE_WEIGHTS, **(weights or {})}
+        font_importance = self['double_fontsize_int'].astype('Int64')*weights['size'] +\
+            self['bold'].astype(bool)*weights['bold'] +\
+            self['text'].astype(str).str.isupper()*weights['uppercase']
+
+        # Keep plain integers unless some sizes are missing
+        if (font_importance.dtype == 'Int64') and not font_importance.isna().any():
+            font_importance = font_importance.astype('int64')
+
+        return font_importance
 
     @property
     def _constructor(self):
@@ -119,10 +236,8 @@ class Lines(pd.DataFrame):
         Sort blocks in the lines by the y position in the document.
         """
         lines = self.copy()
-        lines['page_block'] = lines['page_number'].astype(str)+'_'+lines['block_number'].astype(str)
-        block_y = lines.groupby(['page_block'])['total_y'].min().to_dict()
-        lines['order'] = lines['page_block'].map(block_y)
-        lines = lines.sort_values(by=['order', 'total_y']).drop(columns=['page_block', 'order'])
+        lines['order'] = lines['total_y'].groupby(lines.get_block_keys()).transform('min')
+        lines = lines.sort_values(by=['order', 'total_y']).drop(columns=['order'])
 
         return lines
 
@@ -146,7 +261,7 @@ class Lines(pd.DataFrame):
                 lines['text_base']
                 .str.replace(r'[^A-Za-z ]+', ' ', regex=True)
                 .str.strip()
-                .apply(utils.remove_filler_words)
+                .pipe(matchers.series_remove_filler_words)
                 .isin(exclude_texts)
             ].index
             lines.loc[exclude_indexes, 'ignore'] = True
@@ -173,10 +288,16 @@ class Lines(pd.DataFrame):
         lines['h_group'] = lines['h_group'].cumsum()
 
         # Combine row texts and keep the first element from other columns
+        # The groups are contiguous, so the texts of all groups are joined at once,
+        # and the other columns use the built-in reducers
         lines['text'] = lines['text'].fillna('')
+        texts = join_groups(
+            lines['text'].astype(str).tolist(),
+            (lines['h_group'] - lines['h_group'].min()).to_numpy(),
+            lines['h_group'].nunique()
+        )
         agg_funcs = {
             'index': 'min',
-            'text': lambda x: ' '.join(x.astype(str)),
             'span_number': 'min',
             'origin_x': 'min',
             'bbox_x1': 'min',
@@ -186,25 +307,40 @@ class Lines(pd.DataFrame):
         }
         agg_funcs = {
             **agg_funcs,
-            **{col: 'first' for col in lines if col not in agg_funcs}
+            **{col: 'first' for col in lines if (col not in agg_funcs) and (col != 'text')}
         }
         lines = lines\
             .reset_index()\
             .groupby('h_group')\
-            .agg(agg_funcs)\
+            .agg(agg_funcs)
+        lines.insert(1, 'text', np.array(texts, dtype=object))
+        lines = lines\
             .drop(columns=['h_gap', 'h_group'])\
             .set_index('index')
 
+        # Recalculate the style from the merged font, size, and colors
+        if 'style' in lines.columns:
+            lines['style'] = lines.calculate_style()
+
         return lines
 
     def combine_spans_same_style(self):
         """
+        Combine the text of spans on the same line with the same style, keeping the first span.
         """
         lines = self.copy()
-        lines['text'] = lines\
-            .groupby(['page_number', 'block_number', 'line_number', 'style'])['text']\
-            .transform(lambda x: ' '.join([txt for txt in x if txt == txt]))
-        lines = lines.drop_duplicates(subset=['page_number', 'block_number', 'line_number', 'style', 'text'])
+        keys = ['page_number', 'block_number', 'line_number', 'style']
+
+        # Sort the texts by group, keeping the reading order within groups, and join the texts of all groups at once
+        # Rows with a missing key are not in a group, and get no text
+        codes = lines.groupby(keys, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        texts = lines['text'].to_numpy()[order]
+        has_text = (codes[order] >= 0) & pd.notna(texts)
+        group_texts = join_groups(texts[has_text].tolist(), codes[order][has_text], codes.max()+1 if len(codes) else 0)
+        lines['text'] = pd.Series(group_texts + [np.nan], dtype='object').to_numpy()[codes]
+
+        lines = lines.drop_duplicates(subset=keys+['text'])
 
         return lines
 
@@ -220,9 +356,39 @@ class Lines(pd.DataFrame):
             (lines['text'].str.strip().isin(definitions.BULLETS)) &
             (lines['span_number'] == 0)
         ]
-
-        # Loop through bullets and put bullet item text on the same line_number
-        for i, bullet in bullets.iterrows():
+        if bullets.empty:
+            return lines
+
+        # Bullets at the same y position in the same block could take each other's text,
+        # so these are combined one by one in order
+        bullet_keys = ['page_number', 'block_number', 'total_y']
+        shared_position = bullets.duplicated(subset=bullet_keys, keep=False)
+        bullets_to_merge = bullets.loc[~shared_position].dropna(subset=bullet_keys)
+
+        # Get the text at the same level as each bullet: the first span of another line at the same y in the block
+        positions = lines[bullet_keys+['line_number']].assign(position=range(len(lines)))
+        texts = positions.loc[(lines['span_number'] == 0).values].dropna(subset=bullet_keys)
+        bullet_texts = bullets_to_merge[bullet_keys+['line_number']]\
+            .merge(texts, on=bullet_keys, suffixes=('_bullet', ''))
+        bullet_texts = bullet_texts\
+            .loc[bullet_texts['line_number'] != bullet_texts['line_number_bullet']]\
+            .sort_values(by='position')\
+            .drop_duplicates(subset=bullet_keys)
+
+        # Put the text on the line of the bullet, after the last span of the bullet line
+        bullet_line_spans = lines\
+            .groupby(['page_number', 'block_number', 'line_number'])['span_number'].max()\
+            .rename('bullet_line_span_number')
+        bullet_texts = bullet_texts.join(
+            bullet_line_spans,
+            on=['page_number', 'block_number', 'line_number_bullet']
+        )
+        text_indexes = lines.index[bullet_texts['position'].values]
+        lines.loc[text_indexes, 'line_number'] = bullet_texts['line_number_bullet'].values
+        lines.loc[text_indexes, 'span_number'] = bullet_texts['bullet_line_span_number'].values + 1
+
+        # Loop through bullets sharing a position and put bullet item text on the same line_number
+        for i, bullet in bullets.loc[shared_position].iterrows():
             bullet_block = lines.loc[
                 (lines['page_number'] == bullet['page_number']) &
                 (lines['block_number'] == bullet['block_number'])
@@ -319,101 +485,185 @@ class Lines(pd.DataFrame):
 
         return headings
 
+    def calculate_first_word_size(self):
+        """
+        Get the approximate width of the first word of the text, assuming all characters have the same width.
+        """
+        text = self['text'].astype(str)
+        first_space = text.str.find(' ')
+        first_word_length = first_space.where(first_space >= 0, text.str.len())
+
+        return (self['bbox_x2'] - self['bbox_x1'])*first_word_length/text.str.len()
+
+    def is_sentence_start(self):
+        """
+        Check whether each line is a sentence start. Same as Line.is_sentence_start, calculated over whole columns:
+        True if the first letter is uppercase, None if it is a number, otherwise False.
+        """
+        text = matchers.series_remove_bullet(self['text'].astype(str))
+        first_character = text.str.extract('([A-Za-z0-9])', expand=False)
+
+        sentence_start = pd.Series(False, index=self.index, dtype='object')
+        sentence_start[first_character.str.isupper().astype('boolean').fillna(False)] = True
+        sentence_start[first_character.str.isdigit().astype('boolean').fillna(False)] = None
+
+        return sentence_start
+
+    def is_sentence_end(self):
+        """
+        Check whether each line is a sentence end. Same as Line.is_sentence_end, calculated over whole columns.
+        """
+        sentence_enders = ['.', '?', '!']
+        exceptions = ('e.g.', 'i.e.')
+
+        text = self['text'].astype(str).str.strip().str.lower()
+
+        return text.str[-1].isin(sentence_enders) & ~text.str.endswith(exceptions)
+
     def to_items(self):
         """
         Convert the Lines object to a list or dict of text.
         """
-        lines = self.copy()
-        if len(lines) > 1:
-
-            # Get which lines start with a bullet
-            lines['bullet_start'] = False
-            lines.loc[lines.is_bullet_start(), 'bullet_start'] = True
-
-            # Remove bullet points from the text
-            lines = lines.loc[~(
-                lines['text'].str.strip().apply(utils.is_bullet) &
-                (lines['span_number'] == 0)
-            )]
-
-            # Get the approximate size of the first word
-            lines['end_gap'] = lines['bbox_x2'].max() - lines['bbox_x2']
-            lines['first_word_size'] = lines.apply(
-                lambda row:
-                    (row['bbox_x2'] - row['bbox_x1']) *
-                    len(row['text'].split(' ')[0]) / len(row['text']),
-                axis=1
-            )
+        return self.segment_items(np.arange(len(self)), np.zeros(len(self), dtype=int), 1)[0]
 
-            # Get sentence end and sentence start
-            lines['sentence_start'] = lines.apply(lambda row: row.is_sentence_start(), axis=1)
-            lines['sentence_end'] = lines.apply(lambda row: row.is_sentence_end(), axis=1)
+    def to_range_items(self, starts, ends):
+        """
+        Convert the lines in several ranges of positions to lists of text in one pass,
+        e.g. the sections given by the section_start and section_end columns.
+        Gives the same items as calling to_items on self.iloc[start:end] for each range.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        lengths = np.maximum(np.asarray(ends, dtype=np.int64) - starts, 0)
+        section_numbers = np.repeat(np.arange(len(starts)), lengths)
+        range_offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
 
-            # Get whether or not the sentence is the start of a new "item"
-            # # 1. line starts with a bullet point
-            lines['sentence_start_with_bullet'] = False
-            lines.loc[
-                lines['sentence_start'].fillna(True) & lines['bullet_start'],
-                'sentence_start_with_bullet'
-            ] = True
+        return self.segment_items(np.arange(lengths.sum()) + range_offsets, section_numbers, len(starts))
 
-            # # 2. previous line is short
-            line_enders = [':']
-            lines['previous_line_ends_short'] = False
-            lines.loc[
-                lines['sentence_start'].fillna(True) & (
-                    (
-                        lines['sentence_end'].shift(1).fillna(True) |
-                        lines['text'].shift(1).str.strip().str[-1].isin(line_enders)
-                    ) &
-                    ((lines['total_y'] - lines['total_y'].shift(1).fillna(-1)) >= lines['size']*0.1) &
-                    (lines['end_gap'].shift(1).fillna(-1) >= lines['first_word_size']*1.2)
-                ),
-                'previous_line_ends_short'
-            ] = True
+    def segment_items(self, positions, section_numbers, n_sections):
+        """
+        Group the lines of each section into items (bullet points, paragraphs, etc.) and combine their text.
+        Each line is scored once, even if it is in several sections,
+        and the rules comparing a line to the previous line are applied within each section.
 
-            # # 3. significant vertical gap
-            line_spacing_min = (lines['total_y'] - lines['total_y'].shift(1)).min()
-            lines['vertical_gap'] = False
-            lines.loc[
-                lines['sentence_start'].fillna(True) & (
-                    (lines['page_number'] == lines['page_number'].shift(1).fillna(0)) &
-                    ((lines['total_y'] - lines['total_y'].shift(1).fillna(-1)) > lines['size'].apply(
-                        lambda size: max(size*1.5, line_spacing_min*1.5)
-                    ))
-                ),
-                'vertical_gap'
-            ] = True
+        Parameters
+        ----------
+        positions : array of ints (required)
+            Positions of the lines of all sections, with the lines of each section together and in reading order.
 
-            # New group is when the item starts and the previous item ends
-            lines['item_start'] = lines[[
-                'sentence_start_with_bullet', 'previous_line_ends_short', 'vertical_gap'
-            ]].any(axis=1)
-            lines['item_no'] = lines['item_start'].cumsum()
+        section_numbers : array of ints (required)
+            Section of each position, in increasing order.
 
-            # Group into items and combine the text
-            lines = lines.groupby(['item_no'])[['text', 'bullet_start']].agg({
-                'text': lambda x: ' '.join(x.str.strip()),
-                'bullet_start': 'first'
-            })
-            lines = lines.dropna(subset=['text'])
+        n_sections : int (required)
+            Number of sections.
 
-            # Remove bullets for cases where all items are bullets
-            lines['text'] = lines['text'].astype(str).apply(utils.remove_bullet)
-            if not lines['bullet_start'].all():
-                lines.loc[lines['bullet_start'], 'text'] = '• ' + lines['text']
+        Returns
+        -------
+        items : list of lists of strings
+            Items of each section.
+        """
+        section_items = [[] for _ in range(n_sections)]
+        if not len(positions):
+            return section_items
+
+        # Score each line, then get the lines of each section
+        text = self['text']
+        scores = {
+            'text': text,
+            'span_number': self['span_number'],
+            'page_number': self['page_number'],
+            'total_y': self['total_y'],
+            'size': self['size'],
+            'bbox_x2': self['bbox_x2'],
+            'bulleted': matchers.series_is_bulleted(text),
+            'bullet': matchers.series_is_bulleted(text, end=True),
+            'first_word_size': self.calculate_first_word_size(),
+            'sentence_start': self.is_sentence_start(),
+            'sentence_end': self.is_sentence_end(),
+        }
+        lines = pd.DataFrame({column: values.to_numpy()[positions] for column, values in scores.items()})
+        lines['section'] = section_numbers
+
+        # Sections with a single line are not segmented
+        section_sizes = np.bincount(section_numbers, minlength=n_sections)
+        lines['segmented'] = section_sizes[section_numbers] > 1
+
+        # Get which lines start with a bullet
+        # i.e. they meet a bullet format, or follow a bullet point on the same level
+        new_section = lines['section'] != lines['section'].shift(1)
+        lines['bullet_start'] = (
+            (lines['bulleted'] & (lines['span_number'] == 0)) |
+            (
+                (lines['total_y'] == get_previous_in_sections(lines['total_y'], new_section).fillna(-1)) &
+                get_previous_in_sections(lines['bullet'], new_section, False)
+            )
+        )
 
-        # Convert to list
-        items = lines['text'].dropna().astype(str).str.strip().tolist()
+        # Remove bullet points from the text
+        lines = lines.loc[~(lines['bullet'] & (lines['span_number'] == 0) & lines['segmented'])]
+        lines = lines.reset_index(drop=True)
+        if lines.empty:
+            return section_items
+        new_section = lines['section'] != lines['section'].shift(1)
+
+        # Get the gap at the end of each line
+        lines['end_gap'] = lines.groupby('section')['bbox_x2'].transform('max') - lines['bbox_x2']
+
+        # Get whether or not the sentence is the start of a new "item"
+        sentence_start = lines['sentence_start'].astype('boolean').fillna(True).astype(bool)
+        vertical_distance = lines['total_y'] - get_previous_in_sections(lines['total_y'], new_section).fillna(-1)
+
+        # # 1. line starts with a bullet point
+        lines['sentence_start_with_bullet'] = sentence_start & lines['bullet_start']
+
+        # # 2. previous line is short
+        line_enders = [':']
+        lines['previous_line_ends_short'] = sentence_start & (
+            (
+                get_previous_in_sections(lines['sentence_end'], new_section, True) |
+                get_previous_in_sections(lines['text'], new_section).str.strip().str[-1].isin(line_enders)
+            ) &
+            (vertical_distance >= lines['size']*0.1) &
+            (get_previous_in_sections(lines['end_gap'], new_section).fillna(-1) >= lines['first_word_size']*1.2)
+        )
+
+        # # 3. significant vertical gap
+        line_spacing = lines['total_y'] - get_previous_in_sections(lines['total_y'], new_section)
+        line_spacing_min = line_spacing.groupby(lines['section']).transform('min')
+        lines['vertical_gap'] = sentence_start & (
+            (lines['page_number'] == get_previous_in_sections(lines['page_number'], new_section).fillna(0)) &
+            (vertical_distance > (lines['size']*1.5).clip(lower=line_spacing_min*1.5))
+        )
+
+        # New group is when the item starts and the previous item ends, or a new section starts
+        lines['item_start'] = lines[[
+            'sentence_start_with_bullet', 'previous_line_ends_short', 'vertical_gap'
+        ]].any(axis=1) | new_section | ~lines['segmented']
+        lines['item_no'] = lines['item_start'].cumsum()
+
+        # Group into items and combine the text
+        lines['text'] = lines['text'].str.strip()
+        items = lines.groupby('item_no', sort=False).agg(
+            text=('text', ' '.join),
+            bullet_start=('bullet_start', 'first'),
+            section=('section', 'first'),
+            segmented=('segmented', 'first'),
+        )
+
+        # Remove bullets for cases where all items of the section are bullets
+        items['text'] = items['text'].where(~items['segmented'], matchers.series_remove_bullet(items['text']))
+        some_bullets = items['segmented'] & ~items.groupby('section')['bullet_start'].transform('all')
+        items.loc[some_bullets & items['bullet_start'], 'text'] = '• ' + items['text']
 
         # Tidy sentences, and remove items with no characters
-        items = [
-            utils.tidy_sentence(txt)
-            for txt in items
-            if re.search('[a-zA-Z]', txt)
-        ]
+        texts = items['text'].str.strip()
+        has_characters = texts.str.contains('[a-zA-Z]')
+        texts = texts\
+            .str.replace(matchers.MULTIPLE_SPACES_PATTERN, ' ', regex=True)\
+            .str.replace(r' \.$', '.', regex=True)
+        for section, text in zip(items.loc[has_characters, 'section'], texts.loc[has_characters]):
+            section_items[section].append(text)
 
-        return items
+        return section_items
 
     def is_bullet_start(self):
         """
@@ -425,16 +675,16 @@ class Lines(pd.DataFrame):
 
         # The row is a bullet start if it meets a bullet format (i.e. bullet point character, "a)", "a.", etc.)
         lines.loc[
-            lines['text'].str.strip().apply(utils.is_bulleted) &
+            matchers.series_is_bulleted(lines['text']) &
             (lines['span_number'] == 0),
             'bullet_start'
         ] = True
 
         # The row is a bullet start if the previous row is a bullet, and is on the same level
-        lines['bullet'] = lines['text'].str.strip().apply(utils.is_bullet)
+        lines['bullet'] = matchers.series_is_bulleted(lines['text'], end=True)
         lines.loc[
             (lines['total_y'] == lines['total_y'].shift(1).fillna(-1)) &
-            lines['bullet'].shift(1).fillna(False),
+            lines['bullet'].shift(1, fill_value=False),
             'bullet_start'
         ] = True
 
@@ -0,0 +1,209 @@
+"""
+Precompiled patterns for matching bullets, enumerations, and phrases in text.
+Each matcher has a version for a single string and a version for a pandas Series of strings.
+"""
+import re
+from functools import lru_cache
+from pdf_structure_extractor import definitions
+
+# Set of bullet point characters for fast lookups
+BULLET_CHARACTERS = frozenset(definitions.BULLETS)
+
+# Bullet point character, or enumeration format: 1), 1., a), a., i), ii., ... xx)
+_BULLET_OR_ENUMERATION = '(?:{}|{}|{}|{})'.format(
+    '|'.join(re.escape(bullet) for bullet in definitions.BULLETS),
+    r'[1-9][).]',
+    r'[a-zA-Z][).]',
+    r'(?i:X{0,3}(?:IX|IV|V?I{0,3})[).])'
+)
+
+# Text starting with a bullet point or enumeration
+BULLETED_PATTERN = re.compile(_BULLET_OR_ENUMERATION + r'\s')
+
+# Text which is only a bullet point or enumeration
+BULLET_PATTERN = re.compile(_BULLET_OR_ENUMERATION + r'$')
+
+# Enumerations removed from the start of bullet point text
+NUMBER_PREFIX_PATTERN = re.compile(r'^[1-9](\)|\.)\s')
+LETTER_PREFIX_PATTERN = re.compile(r'^[a-zA-Z](\)|\.)\s')
+ROMAN_NUMERAL_PREFIX_PATTERN = re.compile(r'^(X{0,3})(IX|IV|V?I{0,3})(\)|\.)\s')
+
+MULTIPLE_SPACES_PATTERN = re.compile(' +')
+
+
+def is_bulleted(text, end=False):
+    """
+    Check whether the text starts with a bullet point or enumeration ("a)", "a.", etc.).
+    If end is True, only return True if the whole text is a bullet point.
+    """
+    pattern = BULLET_PATTERN if end else BULLETED_PATTERN
+    return pattern.match(text.strip()) is not None
+
+
+def series_is_bulleted(texts, end=False):
+    """
+    Check whether each text in a Series starts with a bullet point or enumeration.
+    If end is True, only return True where the whole text is a bullet point.
+    """
+    pattern = BULLET_PATTERN if end else BULLETED_PATTERN
+    return texts.str.strip().str.match(pattern, na=False).astype(bool)
+
+
+def remove_bullet(text):
+    """
+    Remove bullet characters and enumerations from the beginning of the text.
+    """
+    text = text.strip()
+
+    # Remove bullet point
+    if text[0] in BULLET_CHARACTERS:
+        return text[1:]
+
+    # Remove 1), 1., then a), a., then i, ii, etc.
+    text = NUMBER_PREFIX_PATTERN.sub('', text)
+    text = LETTER_PREFIX_PATTERN.sub('', text).strip()
+    text = ROMAN_NUMERAL_PREFIX_PATTERN.sub('', text).strip()
+
+    return text
+
+
+def series_remove_bullet(texts):
+    """
+    Remove bullet characters and enumerations from the beginning of each text in a Series.
+    """
+    texts = texts.str.strip()
+    starts_with_bullet = texts.str[0].isin(BULLET_CHARACTERS)
+    without_enumeration = texts\
+        .str.replace(NUMBER_PREFIX_PATTERN, '', regex=True)\
+        .str.replace(LETTER_PREFIX_PATTERN, '', regex=True)\
+        .str.strip()\
+        .str.replace(ROMAN_NUMERAL_PREFIX_PATTERN, '', regex=True)\
+        .str.strip()
+
+    return without_enumeration.where(~starts_with_bullet, texts.str[1:])
+
+
+@lru_cache(maxsize=4096)
+def get_phrase_pattern(phrase):
+    """
+    Get the compiled pattern matching a phrase as whole words.
+    """
+    return re.compile(r"\b{}\b".format(phrase))
+
+
+class PhraseMatcher:
+    def __init__(self, phrases):
+        """
+        Match any of several phrases as whole words with a single compiled alternation.
+        Earlier phrases take priority where phrases overlap.
+
+        Parameters
+        ----------
+        phrases : list of strings (required)
+            Phrases to match. These are regular expressions, as in utils.phrase_in_sentence.
+        """
+        self.phrases = list(phrases)
+        self.pattern = re.compile(r"\b(?:{})\b".format('|'.join(
+            '(?:{})'.format(phrase) for phrase in self.phrases
+        )))
+
+    def replace(self, repl, sentence):
+        """
+        Replace all of the phrases in the sentence, and convert multiple spaces to single spaces.
+        """
+        replaced = self.pattern.sub(repl, sentence.lower().strip())
+        return MULTIPLE_SPACES_PATTERN.sub(' ', replaced)
+
+    def series_replace(self, repl, sentences):
+        """
+        Replace all of the phrases in each sentence of a Series.
+        """
+        return sentences\
+            .str.lower()\
+            .str.strip()\
+            .str.replace(self.pattern, repl, regex=True)\
+            .str.replace(MULTIPLE_SPACES_PATTERN, ' ', regex=True)
+
+
+# Filler words are single words, so removing them all at once is the same as removing them one by one
+FILLER_WORDS_MATCHER = PhraseMatcher(definitions.FILLER_WORDS)
+
+
+def remove_filler_words(text):
+    """
+    Remove filler words ("and", "the", etc.) from the text.
+    """
+    if text != text:
+        return
+    return FILLER_WORDS_MATCHER.replace('', str(text)).strip()
+
+
+def series_remove_filler_words(texts):
+    """
+    Remove filler words ("and", "the", etc.) from each text in a Series.
+    """
+    return FILLER_WORDS_MATCHER.series_replace('', texts.astype(str)).str.strip().where(texts.notna(), None)
+
+
+class AbbreviationMatcher:
+    def __init__(self, abbreviations):
+        """
+        Rewrite phrases and their abbreviations to one canonical form, in a single pass over a sentence.
+        Sentences with a common variation in utils.generate_sentence_variations have the same canonical form,
+        so they can be compared without generating the variations. Sentences using different abbreviations
+        of the same phrase also have the same canonical form.
+
+        Phrases which are abbreviations of each other, directly or through other phrases, have the same canonical form:
+        the first of them in abbreviations. Longer phrases are matched first where phrases overlap.
+
+        Parameters
+        ----------
+        abbreviations : dict (required)
+            Phrases and lists of their abbreviations, e.g. {'lessons learned': ['lessons learnt']}.
+            The phrases and abbreviations are matched as regular expressions, as in utils.phrase_in_sentence.
+        """
+        self.abbreviations = abbreviations
+
+        # Group the phrases which are abbreviations of each other, keeping the first phrase of each group
+        canonical = {}
+
+        def find(phrase):
+            while canonical[phrase] != phrase:
+                phrase = canonical[phrase]
+            return phrase
+
+        for phrase, phrase_abbreviations in abbreviations.items():
+            for abbreviation in [phrase, *phrase_abbreviations]:
+                canonical.setdefault(abbreviation, abbreviation)
+                root, abbreviation_root = find(phrase), find(abbreviation)
+                if root != abbreviation_root:
+                    canonical[abbreviation_root] = root
+        self.canonical = {phrase: find(phrase) for phrase in canonical}
+
+        # One alternation of all the phrases, longest first, with a named group per phrase to find its canonical form
+        self.phrases = sorted(self.canonical, key=len, reverse=True)
+        self.group_phrases = {'p{}'.format(number): phrase for number, phrase in enumerate(self.phrases)}
+        self.pattern = re.compile(r"\b(?:{})\b".format('|'.join(
+            '(?P<{}>{})'.format(group, phrase) for group, phrase in self.group_phrases.items()
+        ))) if self.phrases else None
+
+    def replace_match(self, match):
+        return self.canonical[self.group_phrases[match.lastgroup]]
+
+    def canonicalise(self, sentence):
+        """
+        Rewrite the phrases in the sentence to their canonical forms, in lower case with single spaces.
+        """
+        sentence = sentence.lower().strip()
+        if self.pattern is not None:
+            sentence = self.pattern.sub(self.replace_match, sentence)
+        return MULTIPLE_SPACES_PATTERN.sub(' ', sentence)
+
+    def series_canonicalise(self, sentences):
+        """
+        Rewrite the phrases in each sentence of a Series to their canonical forms.
+        """
+        sentences = sentences.str.lower().str.strip()
+        if self.pattern is not None:
+            sentences = sentences.str.replace(self.pattern, self.replace_match, regex=True)
+        return sentences.str.replace(MULTIPLE_SPACES_PATTERN, ' ', regex=True)
@@ -0,0 +1,224 @@
+"""
+Configurable sequence of the stages which clean the lines of a document.
+"""
+
+# Stages disabled by each preset, and whether the preset skips the stages which can only find something new
+# if an earlier stage dropped rows
+PRESETS = {
+    'default': {
+        'disabled': [],
+        'short_circuit': False,
+    },
+    'fast': {
+        'disabled': [
+            'remove_photo_blocks',
+            'remove_date_superscripts',
+        ],
+        'short_circuit': True,
+    },
+}
+
+
+class Pipeline:
+    def __init__(self, memoise=False, short_circuit=False):
+        """
+        Ordered stages, each a callable taking Lines and returning Lines, which can be enabled, disabled,
+        and reordered.
+
+        A stage can be set to run only if an earlier stage dropped rows, e.g. a second pass which usually only finds
+        something new when the first pass removed rows, or only if an earlier stage dropped nothing.
+
+        Parameters
+        ----------
+        memoise : bool (default=False)
+            If True, keep the output of each stage, so that running the pipeline again on the same lines
+            only runs the stages from the first stage which changed. Each stage is given a copy of the previous
+            output, so this uses more memory.
+
+        short_circuit : bool (default=False)
+            If True, stages with run_if_dropped are skipped when none of those stages dropped rows.
+            This is faster, but can give different lines if the stage would have dropped rows anyway.
+            If False, these stages always run.
+        """
+        self.stages = []
+        self.memoise = memoise
+        self.short_circuit = short_circuit
+
+        # Key and output of each stage run in the last run, used when memoise is set
+        self.memo = []
+
+        # Input lines and options of the last run, kept so that their ids are not reused while the memo refers to them
+        self.memo_inputs = None
+
+        # Number of rows dropped by each stage in the last run, or None if the stage was skipped
+        self.dropped = {}
+
+    def __repr__(self):
+        return 'Pipeline({})'.format(', '.join(
+            stage['name'] if stage['enabled'] else '({})'.format(stage['name']) for stage in self.stages
+        ))
+
+    @property
+    def names(self):
+        return [stage['name'] for stage in self.stages]
+
+    @property
+    def enabled(self):
+        """
+        Get the names of the enabled stages, in order.
+        """
+        return [stage['name'] for stage in self.stages if stage['enabled']]
+
+    def get_position(self, name):
+        if name not in self.names:
+            raise KeyError('Unrecognised stage "{}", should be one of {}'.format(name, self.names))
+        return self.names.index(name)
+
+    def add(
+        self, name, func, enabled=True, run_if_dropped=None, run_unless_dropped=None, options=(), before=None, after=None
+    ):
+        """
+        Add a stage, at the end or before or after another stage.
+
+        Parameters
+        ----------
+        name : string (required)
+            Name of the stage, used to enable, disable, and trace the stage.
+
+        func : callable (required)
+            Function taking Lines, and the options, and returning Lines.
+
+        enabled : bool (default=True)
+            Whether the stage is run.
+
+        run_if_dropped : string or list of strings (default=None)
+            Names of earlier stages. If set and the pipeline short-circuits, the stage is only run if one of these
+            stages was run and dropped rows.
+
+        run_unless_dropped : string (default=None)
+            Name of an earlier stage. If set, the stage is skipped if that stage dropped rows,
+            e.g. to skip detecting something which an earlier stage already removed.
+
+        options : iterable of strings (default=())
+            Names of the keyword arguments of Pipeline.run passed to func.
+
+        before, after : string (default=None)
+            Name of the stage to add the stage before or after.
+        """
+        if name in self.names:
+            raise ValueError('Stage "{}" is already in the pipeline'.format(name))
+        stage = {
+            'name': name,
+            'func': func,
+            'enabled': enabled,
+            'run_if_dropped': [run_if_dropped] if isinstance(run_if_dropped, str) else run_if_dropped,
+            'run_unless_dropped': run_unless_dropped,
+            'options': tuple(options)
+        }
+        if before is not None:
+            self.stages.insert(self.get_position(before), stage)
+        elif after is not None:
+            self.stages.insert(self.get_position(after) + 1, stage)
+        else:
+            self.stages.append(stage)
+
+        return self
+
+    def remove(self, name):
+        del self.stages[self.get_position(name)]
+        return self
+
+    def move(self, name, before=None, after=None):
+        """
+        Move a stage before or after another stage.
+        """
+        stage = self.stages.pop(self.get_position(name))
+        if before is not None:
+            self.stages.insert(self.get_position(before), stage)
+        elif after is not None:
+            self.stages.insert(self.get_position(after) + 1, stage)
+        else:
+            self.stages.append(stage)
+
+        return self
+
+    def enable(self, *names):
+        for name in names:
+            self.stages[self.get_position(name)]['enabled'] = True
+        return self
+
+    def disable(self, *names):
+        for name in names:
+            self.stages[self.get_position(name)]['enabled'] = False
+        return self
+
+    def use_preset(self, preset):
+        """
+        Enable all stages, then disable the stages of a preset, 'default' or 'fast', and set whether to short-circuit.
+        """
+        if preset not in PRESETS:
+            raise ValueError('Unrecognised preset "{}", should be one of {}'.format(preset, list(PRESETS)))
+        self.enable(*self.names)
+        self.disable(*[name for name in PRESETS[preset]['disabled'] if name in self.names])
+        self.short_circuit = PRESETS[preset]['short_circuit']
+
+        return self
+
+    def run(self, lines, run_stage=None, **options):
+        """
+        Run the enabled stages on lines, in order. Return the output of the last stage.
+
+        Parameters
+        ----------
+        lines : Lines (required)
+            Input of the first stage.
+
+        run_stage : callable (default=None)
+            Function running each stage as run_stage(name, func, lines, **options), e.g. Document.run_stage to
+            trace the stages. If None, the stages are called directly.
+
+        **options
+            Keyword arguments passed to the stages which take them.
+        """
+        memo = self.memo if self.memoise else []
+        self.memo = []
+        self.memo_inputs = (lines, options) if self.memoise else None
+        self.dropped = {}
+
+        # The key of a stage output is the input lines and options, and the stages run so far
+        key = (id(lines), tuple((name, id(value)) for name, value in sorted(options.items())))
+        for stage in self.stages:
+            name = stage['name']
+            if not stage['enabled']:
+                continue
+            if (
+                self.short_circuit and (stage['run_if_dropped'] is not None) and
+                not any(self.dropped.get(earlier_name) for earlier_name in stage['run_if_dropped'])
+            ) or (
+                (stage['run_unless_dropped'] is not None) and self.dropped.get(stage['run_unless_dropped'])
+            ):
+                self.dropped[name] = None
+                continue
+            key = (key, name, stage['func'], stage['options'])
+
+            # Use the output of the last run if the stages up to this one have not changed
+            position = len(self.memo)
+            if (position < len(memo)) and (memo[position][0] == key):
+                _, output, dropped = memo[position]
+            else:
+                memo = []
+                stage_options = {option: options[option] for option in stage['options'] if option in options}
+                stage_lines = lines.copy() if self.memoise else lines
+                if run_stage is None:
+                    output = stage['func'](stage_lines, **stage_options)
+                else:
+                    output = run_stage(name, stage['func'], stage_lines, **stage_options)
+                dropped = len(lines) - len(output)
+
+            self.dropped[name] = dropped
+            if self.memoise:
+                self.memo.append((key, output, dropped))
+            lines = output
+
+        # Stages can change their input in place, so the memoised outputs are not given out
+        return lines.copy() if self.memoise else lines
@@ -0,0 +1,238 @@
+"""
+Persistent full-text index of the sections of many documents, in a local SQLite database.
+"""
+import os
+import json
+import time
+import sqlite3
+from pdf_structure_extractor import matchers
+from pdf_structure_extractor.heading_index import normalise_title
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS documents (
+    content_hash TEXT PRIMARY KEY,
+    source TEXT,
+    metadata TEXT,
+    added REAL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL REFERENCES documents(content_hash),
+    heading_index INTEGER,
+    heading TEXT,
+    heading_normalised TEXT,
+    level INTEGER,
+    page_number INTEGER,
+    items TEXT
+);
+CREATE INDEX IF NOT EXISTS sections_document ON sections(content_hash);
+CREATE INDEX IF NOT EXISTS sections_heading ON sections(heading_normalised);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_text USING fts5(heading, items);
+"""
+
+
+def quote_phrase(phrase):
+    """
+    Quote a phrase for an FTS5 query.
+    """
+    return '"{}"'.format(phrase.replace('"', '""'))
+
+
+class SectionIndex:
+    def __init__(self, path, abbreviations=None):
+        """
+        Index of the headings, levels, and items of the sections of many documents, stored in SQLite with FTS5.
+        Documents are keyed by the hash of their content, so adding a document again replaces its sections.
+        Headings are stored normalised as in HeadingIndex, so titles are found with abbreviations.
+
+        Parameters
+        ----------
+        path : string (required)
+            Path of the SQLite database. Created, with its directory, if it does not exist.
+
+        abbreviations : dict (default=None)
+            Phrases and lists of their abbreviations, as in HeadingIndex. They are stored in the database,
+            and used when the index is opened again without abbreviations.
+            Changing the abbreviations of an index with documents raises a ValueError, as the headings would have to
+            be normalised again.
+        """
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+        stored = self.connection.execute("SELECT value FROM settings WHERE name = 'abbreviations'").fetchone()
+        stored = json.loads(stored['value']) if stored is not None else None
+        if abbreviations is None:
+            abbreviations = stored or {}
+        elif (stored is not None) and (abbreviations != stored) and len(self):
+            raise ValueError('The index has documents added with other abbreviations, use a new index')
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (name, value) VALUES ('abbreviations', ?)", (json.dumps(abbreviations),)
+            )
+        self.abbreviations = abbreviations
+        self.abbreviation_matcher = matchers.AbbreviationMatcher(abbreviations)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def normalise(self, text):
+        return normalise_title(text, self.abbreviation_matcher)
+
+    def has_document(self, content_hash):
+        return self.connection.execute(
+            'SELECT 1 FROM documents WHERE content_hash = ?', (content_hash,)
+        ).fetchone() is not None
+
+    def add_document(self, content_hash, sections, source=None, metadata=None):
+        """
+        Add or replace the sections of a document.
+
+        Parameters
+        ----------
+        content_hash : string (required)
+            Hash of the content of the PDF, e.g. Document.content_hash.
+
+        sections : list of dicts (required)
+            Sections of the document, as returned by Document.to_sections.
+
+        source : string (default=None)
+            URL or path of the document.
+
+        metadata : dict (default=None)
+            Values to filter documents by when searching, e.g. {'year': 2021, 'type': 'final report'}.
+        """
+        with self.connection:
+            self.delete_sections(content_hash)
+            self.connection.execute(
+                'INSERT OR REPLACE INTO documents (content_hash, source, metadata, added) VALUES (?, ?, ?, ?)',
+                (content_hash, source, json.dumps(metadata or {}), time.time())
+            )
+            for section in sections:
+                heading_normalised = self.normalise(section['heading'])
+                section_id = self.connection.execute(
+                    'INSERT INTO sections (content_hash, heading_index, heading, heading_normalised, level, '
+                    'page_number, items) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        content_hash, section['index'], section['heading'], heading_normalised,
+                        section['level'], section['page_number'], json.dumps(section['items'])
+                    )
+                ).lastrowid
+                self.connection.execute(
+                    'INSERT INTO sections_text (rowid, heading, items) VALUES (?, ?, ?)',
+                    (section_id, heading_normalised, '\n'.join(str(item) for item in section['items']))
+                )
+
+    def delete_sections(self, content_hash):
+        self.connection.execute(
+            'DELETE FROM sections_text WHERE rowid IN (SELECT id FROM sections WHERE content_hash = ?)',
+            (content_hash,)
+        )
+        self.connection.execute('DELETE FROM sections WHERE content_hash = ?', (content_hash,))
+
+    def remove_document(self, content_hash):
+        """
+        Remove a document and its sections.
+        """
+        with self.connection:
+            self.delete_sections(content_hash)
+            self.connection.execute('DELETE FROM documents WHERE content_hash = ?', (content_hash,))
+
+    def search(self, heading=None, heading_contains=None, query=None, level=None, metadata=None, limit=None):
+        """
+        Find sections across documents. All the conditions which are set must match.
+
+        Parameters
+        ----------
+        heading : string (default=None)
+            Title of the sections, compared after normalisation, e.g. 'Lessons Learnt' also finds 'Lessons learned'
+            if they are abbreviations of each other.
+
+        heading_contains : string (default=None)
+            Phrase in the headings of the sections, as whole words after normalisation.
+
+        query : string (default=None)
+            SQLite FTS5 query over the normalised headings and the items, e.g. 'cash AND voucher*'.
+
+        level : int (default=None)
+            Level of the sections.
+
+        metadata : dict (default=None)
+            Values of the document metadata. A tuple (low, high) matches values in the range, e.g. {'year': (2019, 2023)}.
+
+        limit : int (default=None)
+            Maximum number of sections to return.
+
+        Returns
+        -------
+        sections : list of dicts
+            Content hash, source, and metadata of the document, and index, heading, level, page number,
+            and items of each section, as in Document.to_sections. In document and reading order,
+            or by relevance if there is a full-text condition.
+        """
+        conditions = []
+        parameters = []
+        match_expressions = []
+        if heading is not None:
+            conditions.append('s.heading_normalised = ?')
+            parameters.append(self.normalise(heading))
+        if heading_contains is not None:
+            match_expressions.append('heading : {}'.format(quote_phrase(self.normalise(heading_contains))))
+        if query is not None:
+            match_expressions.append('({})'.format(query))
+        if level is not None:
+            conditions.append('s.level = ?')
+            parameters.append(level)
+        for name, value in (metadata or {}).items():
+            if isinstance(value, tuple):
+                conditions.append('json_extract(d.metadata, ?) BETWEEN ? AND ?')
+                parameters.extend(['$.'+name, *value])
+            else:
+                conditions.append('json_extract(d.metadata, ?) = ?')
+                parameters.extend(['$.'+name, value])
+
+        sql = 'SELECT d.content_hash, d.source, d.metadata, s.heading_index, s.heading, s.level, s.page_number, ' \
+              's.items FROM sections s JOIN documents d ON d.content_hash = s.content_hash'
+        order = 's.content_hash, s.heading_index'
+        if match_expressions:
+            sql += ' JOIN sections_text t ON t.rowid = s.id'
+            conditions.insert(0, 'sections_text MATCH ?')
+            parameters.insert(0, ' AND '.join(match_expressions))
+            order = 't.rank'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY ' + order
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+
+        return [
+            {
+                'content_hash': row['content_hash'],
+                'source': row['source'],
+                'metadata': json.loads(row['metadata']),
+                'index': row['heading_index'],
+                'heading': row['heading'],
+                'level': row['level'],
+                'page_number': row['page_number'],
+                'items': json.loads(row['items'])
+            }
+            for row in self.connection.execute(sql, parameters)
+        ]
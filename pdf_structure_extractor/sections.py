@@ -0,0 +1,128 @@
+"""
+Access the sections of a document from the section ranges added by Document.get_structure.
+"""
+import numpy as np
+
+
+class Section:
+    def __init__(self, lines, position):
+        """
+        Section of a document: a heading and the lines up to the next line with at least the same font importance.
+        The lines are a positional slice of the document lines, taken when they are used.
+
+        Parameters
+        ----------
+        lines : Lines (required)
+            Lines of the document, with the section_start, section_end, and parent columns from get_structure.
+
+        position : int (required)
+            Position of the heading in the lines.
+        """
+        self.document_lines = lines
+        self.position = position
+
+    def __repr__(self):
+        return 'Section({!r}, level={}, lines={})'.format(self.heading['text'], self.level, self.end - self.start)
+
+    @property
+    def heading(self):
+        return self.document_lines.iloc[self.position]
+
+    @property
+    def index(self):
+        return int(self.document_lines.index[self.position])
+
+    @property
+    def start(self):
+        return int(self.document_lines['section_start'].iat[self.position])
+
+    @property
+    def end(self):
+        return int(self.document_lines['section_end'].iat[self.position])
+
+    @property
+    def level(self):
+        return int(self.document_lines['level'].iat[self.position])
+
+    @property
+    def page_number(self):
+        return int(self.document_lines['page_number'].iat[self.position])
+
+    @property
+    def lines(self):
+        """
+        Get the lines of the section, including the lines of its subsections.
+        """
+        return self.document_lines.iloc[self.start:self.end]
+
+    @property
+    def children(self):
+        """
+        Get the sections directly inside this section.
+        """
+        lines = self.lines
+        positions = np.flatnonzero(
+            (lines['parent'].to_numpy() == self.index) & (lines['section_start'].to_numpy() >= 0)
+        )
+
+        return [Section(self.document_lines, self.start + position) for position in positions]
+
+    def to_items(self):
+        return self.lines.to_items()
+
+    def to_dict(self):
+        """
+        Get the index, heading, level, page number, and items of the section, as in Document.to_sections.
+        """
+        return {
+            'index': self.index,
+            'heading': self.heading['text'],
+            'level': self.level,
+            'page_number': self.page_number,
+            'items': self.to_items()
+        }
+
+
+class Sections:
+    def __init__(self, lines):
+        """
+        Sections of a document in reading order, which can be looked up by the index of their heading.
+
+        Parameters
+        ----------
+        lines : Lines (required)
+            Lines of the document, with the section_start, section_end, and parent columns from get_structure.
+        """
+        self.lines = lines
+        self.positions = np.flatnonzero(lines['section_start'].to_numpy() >= 0)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        for position in self.positions:
+            yield Section(self.lines, position)
+
+    def __getitem__(self, index):
+        """
+        Get the section of the heading with an index label.
+        """
+        position = self.lines.index.get_loc(index)
+        if self.lines['section_start'].iat[position] < 0:
+            raise KeyError('Line {} is not a heading'.format(index))
+
+        return Section(self.lines, position)
+
+    def __contains__(self, index):
+        return (index in self.lines.index) and (self.lines['section_start'].iat[self.lines.index.get_loc(index)] >= 0)
+
+    @property
+    def roots(self):
+        """
+        Get the sections which are not inside another section.
+        """
+        return [
+            Section(self.lines, position)
+            for position in self.positions
+            if self.lines['parent'].iat[position] < 0
+        ]
@@ -0,0 +1,139 @@
+"""
+Open PDF documents from URLs, local paths, file-like objects, or bytes.
+"""
+import os
+import io
+import mmap
+import tempfile
+from functools import lru_cache
+from urllib.parse import urlparse
+import fitz
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connect and read timeouts for downloads, in seconds
+DEFAULT_TIMEOUT = (10, 120)
+
+
+@lru_cache(maxsize=None)
+def get_session(retries=3, pool_maxsize=10):
+    """
+    Get a requests session shared between downloads, with connection pooling and retries on server errors.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET', 'HEAD']
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def is_url(source):
+    """
+    Check whether the document source is an HTTP(S) URL.
+    """
+    if not isinstance(source, str):
+        return False
+    return urlparse(source).scheme in ['http', 'https']
+
+
+def download(url, session=None, timeout=DEFAULT_TIMEOUT, chunk_size=1024*1024):
+    """
+    Stream a document to a temporary file, without holding the whole document in memory.
+    Return the path of the temporary file, which should be deleted by the caller.
+    """
+    if session is None:
+        session = get_session()
+
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as file:
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    file.write(chunk)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+
+    return file.name
+
+
+class PDFSource:
+    def __init__(self, source, session=None, timeout=DEFAULT_TIMEOUT):
+        """
+        Context manager resolving a document input to a file path or an in-memory buffer which PyMuPDF can open.
+        Downloaded files are deleted and memory maps are closed on exit.
+
+        Parameters
+        ----------
+        source : string, path, file-like object, bytes, or memoryview (required)
+            HTTP(S) URL, path to a local file, binary file-like object, or the content of the PDF.
+
+        session : requests.Session (default=None)
+            Session used to download URLs. If None, a shared session with retries is used.
+
+        timeout : float or tuple (default=DEFAULT_TIMEOUT)
+            Connect and read timeouts for downloads, in seconds.
+        """
+        self.source = source
+        self.session = session
+        self.timeout = timeout
+        self.path = None
+        self.stream = None
+        self.temporary_path = None
+        self.mmap = None
+
+    def __enter__(self):
+        source = self.source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.stream = source
+        elif is_url(source):
+            self.temporary_path = download(source, session=self.session, timeout=self.timeout)
+            self.path = self.temporary_path
+        elif isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+        elif hasattr(source, 'read'):
+            try:
+                self.mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+                self.stream = memoryview(self.mmap)
+            except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+                self.stream = source.read()
+        else:
+            raise TypeError('Unsupported document source: {}'.format(type(source).__name__))
+
+        return self
+
+    def __exit__(self, *args):
+        if self.mmap is not None:
+            self.stream.release()
+            self.mmap.close()
+            self.mmap = None
+        self.stream = None
+        if self.temporary_path is not None:
+            os.remove(self.temporary_path)
+            self.temporary_path = None
+
+    def open(self):
+        """
+        Open the document with PyMuPDF.
+        """
+        if self.path is not None:
+            return fitz.open(self.path, filetype='pdf')
+        return fitz.open(stream=self.stream, filetype='pdf')
+
+    @property
+    def shareable(self):
+        """
+        Get the path or content of the document to send to other processes.
+        """
+        if self.path is not None:
+            return self.path
+        return bytes(self.stream)
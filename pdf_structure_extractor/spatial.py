@@ -0,0 +1,94 @@
+"""
+Spatial lookups for bounding boxes on a page.
+"""
+import math
+from collections import defaultdict
+
+
+class GridIndex:
+    def __init__(self, bboxes, bounds, cell_size=32):
+        """
+        Index of bounding boxes bucketed into a regular grid over the page.
+        Used to find the drawings and images which could overlap a span without scanning all of them.
+
+        Parameters
+        ----------
+        bboxes : list of tuples (required)
+            Bounding boxes (x1, y1, x2, y2) to index. Results are returned as positions in this list.
+
+        bounds : tuple (required)
+            Bounding box of the area covered by the grid, usually the page rect.
+            Boxes outside of the bounds are placed in the edge cells.
+
+        cell_size : float (default=32)
+            Width and height of the grid cells, in PDF points.
+        """
+        self.x0 = bounds[0]
+        self.y0 = bounds[1]
+        self.cell_size = cell_size
+        self.n_cols = max(int((bounds[2] - bounds[0]) // cell_size) + 1, 1)
+        self.n_rows = max(int((bounds[3] - bounds[1]) // cell_size) + 1, 1)
+
+        # Boxes with coordinates that can't be placed on the grid are always returned as candidates
+        self.cells = defaultdict(list)
+        self.unplaced = []
+        for position, bbox in enumerate(bboxes):
+            cells = self.get_cells(bbox)
+            if cells is None:
+                self.unplaced.append(position)
+                continue
+            col_start, col_end, row_start, row_end = cells
+            for col in range(col_start, col_end+1):
+                for row in range(row_start, row_end+1):
+                    self.cells[(col, row)].append(position)
+
+    def get_cell(self, value, origin, n_cells):
+        """
+        Get the cell number of a coordinate, clamped to the grid.
+        """
+        cell = min(max((value - origin) / self.cell_size, 0), n_cells - 1)
+        return int(cell)
+
+    def get_cells(self, bbox):
+        """
+        Get the range of grid columns and rows covered by a bounding box.
+        Return None if the box has non-finite coordinates.
+        """
+        if not all(math.isfinite(coordinate) for coordinate in bbox[:4]):
+            return None
+        x1, x2 = sorted((bbox[0], bbox[2]))
+        y1, y2 = sorted((bbox[1], bbox[3]))
+
+        return (
+            self.get_cell(x1, self.x0, self.n_cols),
+            self.get_cell(x2, self.x0, self.n_cols),
+            self.get_cell(y1, self.y0, self.n_rows),
+            self.get_cell(y2, self.y0, self.n_rows)
+        )
+
+    def query(self, bbox):
+        """
+        Get the positions of the indexed boxes which could overlap or contain the bounding box.
+        Positions are returned in the original order of the boxes.
+        """
+        cells = self.get_cells(bbox)
+        if cells is None:
+            return self.all_positions()
+
+        col_start, col_end, row_start, row_end = cells
+        candidates = set(self.unplaced)
+        for col in range(col_start, col_end+1):
+            for row in range(row_start, row_end+1):
+                candidates.update(self.cells.get((col, row), ()))
+
+        return sorted(candidates)
+
+    def all_positions(self):
+        """
+        Get the positions of all indexed boxes.
+        """
+        positions = set(self.unplaced)
+        for cell_positions in self.cells.values():
+            positions.update(cell_positions)
+
+        return sorted(positions)
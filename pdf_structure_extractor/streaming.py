@@ -0,0 +1,113 @@
+"""
+Build the sections of a document incrementally, so that sections can be output before the whole document is processed.
+"""
+from bisect import bisect_left
+import pandas as pd
+from pdf_structure_extractor.lines import Lines
+
+
+class SectionStream:
+    def __init__(self, font_importances):
+        """
+        Sections of a document built from batches of processed lines, in reading order.
+        A section is finished when a line with at least the same font importance as its heading is added,
+        as in Document.get_structure. Lines before the first unfinished section are freed.
+
+        The body text font importance and the heading levels are fixed from the first lines.
+        Font importances which are not in the first lines get the level of the next higher known font importance.
+
+        Parameters
+        ----------
+        font_importances : pandas Series (required)
+            Font importance of the lines used to find the body text and the levels, e.g. the lines of the first pages.
+        """
+        self.levels = sorted(font_importances.unique())
+        self.mode_position = self.levels.index(font_importances.mode().iloc[0])
+        self.body_font_importance = font_importances.value_counts().idxmax()
+
+        # Lines from the first unfinished section, and the positions and font importances of the open headings
+        self.lines = None
+        self.open_headings = []
+
+    def get_level(self, font_importance):
+        """
+        Get the level of a font importance, where 0 is body text, and higher number is higher heading.
+        """
+        return bisect_left(self.levels, font_importance) - self.mode_position
+
+    def add(self, lines):
+        """
+        Add the next lines of the document. Return the sections finished by these lines.
+        Inner sections are returned before the sections containing them.
+        """
+        if lines.empty:
+            return []
+
+        start = 0 if self.lines is None else len(self.lines)
+        self.lines = lines if self.lines is None else Lines(pd.concat([self.lines, lines]))
+
+        # Headings: titles with a font importance greater than the body text
+        titles = lines.titles
+        is_heading = lines.index.isin(titles.index[titles['font_importance'] > self.body_font_importance])
+
+        # Close the sections of headings which are not more important than each line
+        finished = []
+        for position, (importance, heading) in enumerate(
+            zip(lines['font_importance'].tolist(), is_heading), start=start
+        ):
+            while self.open_headings and (self.open_headings[-1][1] <= importance):
+                heading_position, _ = self.open_headings.pop()
+                finished.append((heading_position, position))
+            if heading:
+                self.open_headings.append((position, importance))
+        sections = self.get_sections(finished)
+
+        # Free the lines before the first open heading
+        first_position = self.open_headings[0][0] if self.open_headings else len(self.lines)
+        self.lines = self.lines.iloc[first_position:]
+        self.open_headings = [
+            (heading_position - first_position, importance) for heading_position, importance in self.open_headings
+        ]
+
+        return sections
+
+    def close(self):
+        """
+        Finish the sections still open at the end of the document, and return them.
+        """
+        if self.lines is None:
+            return []
+
+        finished = [(heading_position, len(self.lines)) for heading_position, _ in reversed(self.open_headings)]
+        sections = self.get_sections(finished)
+        self.lines = None
+        self.open_headings = []
+
+        return sections
+
+    def get_sections(self, finished):
+        """
+        Get the heading, level, page number, and items of finished sections.
+
+        Parameters
+        ----------
+        finished : list of tuples (required)
+            Position of the heading of each section, and position of the first line after the section.
+        """
+        index = self.lines.index
+        section_items = self.lines.to_range_items(
+            [heading_position + 1 for heading_position, _ in finished], [end_position for _, end_position in finished]
+        )
+
+        sections = []
+        for (heading_position, _), items in zip(finished, section_items):
+            heading = self.lines.iloc[heading_position]
+            sections.append({
+                'index': int(index[heading_position]),
+                'heading': heading['text'],
+                'level': int(self.get_level(heading['font_importance'])),
+                'page_number': int(heading['page_number']),
+                'items': items
+            })
+
+        return sections
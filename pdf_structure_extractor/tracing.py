@@ -0,0 +1,212 @@
+"""
+Measure the time, rows, and memory of each stage of the document processing.
+"""
+import time
+import cProfile
+import pstats
+import tracemalloc
+import pandas as pd
+
+# Columns of the records of every stage
+RECORD_COLUMNS = ['document', 'stage', 'wall_time', 'cpu_time', 'rows_in', 'rows_out', 'memory_delta']
+
+
+def get_rows(value):
+    """
+    Get the number of rows of a DataFrame, or None if the value is not a DataFrame.
+    """
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+def sum_rows(values):
+    """
+    Sum numbers of rows, or NaN if some are missing, e.g. the rows in of raw_lines, which has no input lines.
+    """
+    return values.sum(min_count=len(values))
+
+
+def get_frame_memory(value):
+    """
+    Get the memory used by the columns and index of a DataFrame, not including the contents of Python objects.
+    """
+    return int(value.memory_usage(index=True, deep=False).sum()) if isinstance(value, pd.DataFrame) else 0
+
+
+class StageTracer:
+    def __init__(self, callback=None, profile=False, trace_memory=False):
+        """
+        Measure the stages of the document processing. Each stage gives a record, a dict with:
+
+        - document: name of the document, the URL or path, or the hash of the content
+        - stage: name of the stage
+        - wall_time, cpu_time: time taken by the stage, in seconds
+        - rows_in, rows_out: number of rows of the input and output lines, or None if they are not lines
+        - memory_delta: change in the memory of the lines frame in bytes, not including the contents of strings
+        - memory_allocated, memory_peak: memory allocated by the stage and peak memory during the stage in bytes,
+          if trace_memory is set
+        - profile: pstats.Stats of the stage, if profile is set
+
+        Records are passed to the callback, and to on_stage, which can be overridden in subclasses.
+
+        Parameters
+        ----------
+        callback : callable (default=None)
+            Function called with the record of each stage.
+
+        profile : bool (default=False)
+            If True, profile each stage with cProfile. This slows down the processing.
+
+        trace_memory : bool (default=False)
+            If True, trace the memory allocated in each stage with tracemalloc. This slows down the processing a lot.
+        """
+        self.callback = callback
+        self.profile = profile
+        self.trace_memory = trace_memory
+
+    def trace(self, name, func, *args, document=None, **kwargs):
+        """
+        Run a stage, func(*args, **kwargs), and record it. The first argument is taken as the input lines.
+        Return the result of the stage.
+        """
+        # Stages can change the input lines in place, so measure them first
+        lines = args[0] if args else None
+        rows_in = get_rows(lines)
+        memory_in = get_frame_memory(lines)
+
+        started_tracemalloc = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracemalloc = True
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        profiler = cProfile.Profile() if self.profile else None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            if profiler is not None:
+                result = profiler.runcall(func, *args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = time.process_time() - cpu_start
+
+            record = {
+                'document': document,
+                'stage': name,
+                'wall_time': wall_time,
+                'cpu_time': cpu_time,
+                'rows_in': rows_in,
+                'rows_out': get_rows(result),
+                'memory_delta': get_frame_memory(result) - memory_in,
+            }
+            if self.trace_memory:
+                memory_end, memory_peak = tracemalloc.get_traced_memory()
+                record['memory_allocated'] = memory_end - memory_start
+                record['memory_peak'] = memory_peak - memory_start
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+        if profiler is not None:
+            record['profile'] = pstats.Stats(profiler)
+
+        self.on_stage(record)
+        if self.callback is not None:
+            self.callback(record)
+
+        return result
+
+    def on_stage(self, record):
+        """
+        Handle the record of a stage. Does nothing, override in subclasses.
+        """
+        pass
+
+
+class StageStatsCollector(StageTracer):
+    def __init__(self, callback=None, profile=False, trace_memory=False):
+        """
+        Tracer keeping the records of the stages of all the documents it traces, e.g. a batch of documents,
+        to find the slowest stages and the documents they are slowest on.
+
+        Parameters
+        ----------
+        callback, profile, trace_memory
+            As in StageTracer.
+        """
+        super().__init__(callback=callback, profile=profile, trace_memory=trace_memory)
+        self.records = []
+
+    def on_stage(self, record):
+        self.records.append(record)
+
+    def add_records(self, records):
+        """
+        Add records traced elsewhere, e.g. in another process.
+        """
+        self.records.extend(records)
+
+    def clear(self):
+        self.records = []
+
+    def to_frame(self):
+        """
+        Get the records as a DataFrame, one row per stage run, without the profiles.
+        """
+        if not self.records:
+            return pd.DataFrame(columns=RECORD_COLUMNS)
+
+        return pd.DataFrame([
+            {key: value for key, value in record.items() if key != 'profile'} for record in self.records
+        ])
+
+    def summary(self):
+        """
+        Get the statistics of each stage across documents, in the order the stages were first run:
+        number of documents and runs, total, mean and max wall time, total CPU time, total rows in and out,
+        rows dropped, and the largest memory change. The rows are NaN for stages which do not take or return lines.
+        """
+        records = self.to_frame()
+        if records.empty:
+            return pd.DataFrame()
+        records['rows_dropped'] = records['rows_in'] - records['rows_out']
+        aggregations = {
+            'documents': ('document', 'nunique'),
+            'runs': ('wall_time', 'size'),
+            'wall_time': ('wall_time', 'sum'),
+            'wall_time_mean': ('wall_time', 'mean'),
+            'wall_time_max': ('wall_time', 'max'),
+            'cpu_time': ('cpu_time', 'sum'),
+            'rows_in': ('rows_in', sum_rows),
+            'rows_out': ('rows_out', sum_rows),
+            'rows_dropped': ('rows_dropped', sum_rows),
+            'memory_delta_max': ('memory_delta', 'max'),
+        }
+        if 'memory_peak' in records:
+            aggregations['memory_peak_max'] = ('memory_peak', 'max')
+
+        return records.groupby('stage', sort=False).agg(**aggregations)
+
+    def slowest(self, stage=None, n=10):
+        """
+        Get the n slowest runs of a stage, or of all stages, with the documents they were run on.
+        """
+        records = self.to_frame()
+        if stage is not None:
+            records = records.loc[records['stage'] == stage]
+
+        return records.sort_values('wall_time', ascending=False).head(n)
+
+    def get_profile(self, stage):
+        """
+        Get the profiles of a stage combined across documents, or None if the stage was not profiled.
+        """
+        profiles = [record['profile'] for record in self.records if (record['stage'] == stage) and 'profile' in record]
+        if not profiles:
+            return None
+
+        stats = pstats.Stats()
+        stats.add(*profiles)
+
+        return stats
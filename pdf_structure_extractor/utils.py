@@ -1,10 +1,10 @@
 import re
 import itertools
-from pdf_structure_extractor import definitions
+from pdf_structure_extractor import matchers
 
 
 def phrase_in_sentence(phrase, sentence):
-    if re.search(r"\b{}\b".format(phrase), sentence.lower().strip()):
+    if matchers.get_phrase_pattern(phrase).search(sentence.lower().strip()):
         return True
     return False
 
@@ -14,14 +14,16 @@ def replace_phrases_in_sentence(phrases, repl, sentence):
     if isinstance(phrases, str):
         phrases = [phrases]
     for phrase in phrases:
-        replaced = re.sub(r"\b{}\b".format(phrase), repl, replaced)
-    replaced = re.sub(' +', ' ', replaced)
+        replaced = matchers.get_phrase_pattern(phrase).sub(repl, replaced)
+    replaced = matchers.MULTIPLE_SPACES_PATTERN.sub(' ', replaced)
     return replaced
 
 
 def generate_sentence_variations(sentence, abbreviations):
     """
     Given a sentence and possible abbreviations, generate all possible sentences with different abbreviation options.
+    The number of sentences grows exponentially with the number of phrases in the sentence:
+    use matchers.AbbreviationMatcher or heading_index.HeadingIndex to compare sentences instead.
     """
     # Find which abbreviations are in sentence
     lsources = [phrase for phrase in abbreviations if phrase_in_sentence(phrase, sentence)]
@@ -89,11 +91,7 @@ def strip_non_alphanumeric(text):
 
 
 def remove_filler_words(text):
-    if text != text:
-        return
-    filler_words = ['and', 'the', 'to', 'for', 'in', 'a', 'in', 'or', 'key']
-    text_without_fillers = replace_phrases_in_sentence(filler_words, '', str(text)).strip()
-    return text_without_fillers
+    return matchers.remove_filler_words(text)
 
 
 def is_bulleted(text, end=False):
@@ -108,36 +106,7 @@ def is_bulleted(text, end=False):
     end : bool (default=False)
         If True, force pattern end. I.e. will only return True if the whole text is a bullet point.
     """
-    text = text.strip()
-
-    # First character is a bullet point character
-    pattern = r'('+r'|'.join(definitions.BULLETS)+r')'
-    pattern += '$' if end else r'\s'
-    if re.match(pattern, text):
-        return True
-
-    close_bracket_or_point = r'(\)|\.)'
-
-    # Text matches the format: 1), 1.
-    pattern = r'^[1-9]' + close_bracket_or_point
-    pattern += '$' if end else r'\s'
-    if re.match(pattern, text):
-        return True
-
-    # Text matches the format: a), a.
-    pattern = r'^[a-zA-Z]' + close_bracket_or_point
-    pattern += '$' if end else r'\s'
-    if re.match(pattern, text):
-        return True
-
-    # Text matches the format: i) ii) ... xx)
-    regex_roman_numerals = r'^(X{0,3})(IX|IV|V?I{0,3})'
-    pattern = regex_roman_numerals + close_bracket_or_point
-    pattern += '$' if end else r'\s'
-    if re.match(pattern, text, re.IGNORECASE):
-        return True
-
-    return False
+    return matchers.is_bulleted(text, end=end)
 
 
 def is_bullet(text):
@@ -151,22 +120,7 @@ def remove_bullet(text):
     """
     Remove bullet characters from the beginning of the text.
     """
-    text = text.strip()
-
-    # Remove bullet point
-    if text[0] in definitions.BULLETS:
-        return text[1:]
-
-    # Remove 1), 1.
-    text = re.sub(r'^[1-9](\)|\.)\s', '', text)
-
-    # Remove a), a.
-    text = re.sub(r'^[a-zA-Z](\)|\.)\s', '', str(text)).strip()
-
-    # Remove i, ii, etc.
-    text = re.sub(r'^(X{0,3})(IX|IV|V?I{0,3})(\)|\.)\s', '', str(text)).strip()
-
-    return text
+    return matchers.remove_bullet(text)
 
 
 def tidy_sentence(text):
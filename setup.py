@@ -1,9 +1,23 @@
+import os
+import re
 from setuptools import setup, find_packages
 
+# Read the version without importing the package, which needs its dependencies
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf_structure_extractor', '__init__.py')) as file:
+    version = re.search(r"^__version__ = '([^']+)'", file.read(), re.M).group(1)
+
 setup(
     name='pdf_structure_extractor',
-    version='1.0.0',
+    version=version,
     description='Parse a PDF including extracting structure (sections, subsections, etc.).',
     packages=find_packages(),
     include_package_data=True,
+    extras_require={
+        'parquet': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': [
+            'pdf-structure-extractor=pdf_structure_extractor.batch:main',
+        ],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,44 @@
+import pandas as pd
+from pdf_structure_extractor.document import Document
+
+
+def get_raw_lines(spans):
+    """
+    Get raw lines from (text, size, block_number, line_number, span_number, origin_y) tuples on page 0.
+    """
+    return pd.DataFrame([
+        {
+            'size': size, 'flags': 0, 'font': 'Helvetica', 'color': '#000000', 'text': text, 'bold': False,
+            'highlight_color': None, 'page_number': 0, 'block_number': block_number, 'line_number': line_number,
+            'span_number': span_number, 'origin_x': 50.0 + 100*span_number, 'origin_y': origin_y,
+            'total_y': origin_y, 'img': False, 'bbox_x1': 50.0, 'bbox_y1': origin_y - size, 'bbox_x2': 300.0,
+            'bbox_y2': origin_y,
+        }
+        for text, size, block_number, line_number, span_number, origin_y in spans
+    ])
+
+
+# "page" makes the block of "Summary" the top block, so the first page label and reference pass drops "page"
+# and stops at "Summary". Then the block of the reference "1" before "Annual Report 2021" is the top block,
+# so only the second pass removes the reference, even though no repeating headers or footers were dropped
+SECOND_PASS_SPANS = [
+    ('Summary', 10.0, 2, 0, 0, 270.0),
+    ('page', 10.0, 2, 2, 0, 56.0),
+    ('1', 6.0, 3, 1, 0, 171.0),
+    ('Annual Report 2021', 10.0, 3, 1, 1, 171.0),
+]
+
+
+def test_default_pipeline_runs_second_header_footer_pass():
+    document = Document(None, raw_lines=get_raw_lines(SECOND_PASS_SPANS))
+
+    assert document.lines['text'].tolist() == ['Summary']
+    assert document.pipeline.dropped['drop_repeating_headers_footers'] == 0
+    assert document.pipeline.dropped['remove_page_labels_references_again'] == 2
+
+
+def test_fast_pipeline_skips_second_header_footer_pass():
+    document = Document(None, raw_lines=get_raw_lines(SECOND_PASS_SPANS), pipeline='fast')
+
+    assert document.lines['text'].tolist() == ['Summary', 'Annual Report 2021']
+    assert document.pipeline.dropped['remove_page_labels_references_again'] is None